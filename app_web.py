@@ -1,13 +1,27 @@
 # app_web.py
+import time
+
 import streamlit as st
-import pandas as pd
 
 from auth import login_user, register_user, hash_password
-from supabase_db import SupabaseDatabase
-from models import UserRole, BetStatus, AnswerType
+from database import get_database
+from betting import BettingManager
+from scoring import ScoringManager
+from models import UserRole, BetStatus, AnswerType, LedgerSource
+from worker import get_worker
+from tracing import trace_run, recent_traces, dump_traces
 
 st.set_page_config(page_title="Reedz", layout="wide")
-db = SupabaseDatabase()
+db = get_database()
+betting = BettingManager(db)
+scoring = ScoringManager(db)
+worker = get_worker(scoring)
+
+# Most candidate answers a numeric what-if sweep will score at once
+MAX_PREVIEW_CANDIDATES = 500
+
+# Seconds between progress refreshes while a queued resolution runs
+POLL_INTERVAL = 1.0
 
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -15,6 +29,8 @@ if "user_id" not in st.session_state:
     st.session_state.user_id = None
 if "role" not in st.session_state:
     st.session_state.role = None
+if "resolve_tasks" not in st.session_state:
+    st.session_state.resolve_tasks = []
 
 def logout():
     st.session_state.user = None
@@ -66,9 +82,64 @@ def login_page():
                 else:
                     st.error(message)
 
+def show_leaderboard(key):
+    """Current top 10, or the frozen standings at the end of a past week"""
+    weeks = db.get_frozen_weeks()
+    options = ["Now"] + [f"End of week {week}" for week in reversed(weeks)]
+    choice = st.selectbox("Standings", options, key=f"{key}_standings")
+    if choice == "Now":
+        leaderboard_data = [{
+            "Rank": row.rank,
+            "Username": row.username,
+            "Reedz": row.reedz_balance,
+            "Predictions": row.total_predictions,
+            "Exact": row.exact_answers
+        } for row in db.get_leaderboard(10)]
+    else:
+        leaderboard_data = [{
+            "Rank": row["rank"],
+            "Username": row["username"],
+            "Season points": row["total_points"],
+            "Week points": row["week_points"]
+        } for row in db.get_week_leaderboard(int(choice.rsplit(" ", 1)[1]))]
+    if leaderboard_data:
+        st.dataframe(leaderboard_data, use_container_width=True, hide_index=True)
+    else:
+        st.info("No users on leaderboard")
+
+def show_performance():
+    """Backend calls of the latest page runs, CLI commands and resolutions in this process"""
+    traces = recent_traces()
+    if not traces:
+        st.info("No traced runs yet")
+        return
+    st.dataframe([{
+        "Run": trace.label,
+        "Started": time.strftime("%H:%M:%S", time.localtime(trace.started_at)),
+        "ms": round(trace.ms, 1),
+        "Calls": len(trace.calls),
+        "Round trips": trace.round_trips,
+        "Rows": sum(call.rows for call in trace.calls),
+        "KB": round(sum(call.payload_bytes for call in trace.calls) / 1024, 1)
+    } for trace in traces], use_container_width=True, hide_index=True)
+    selected = st.selectbox("Run", range(len(traces)), key="performance_run",
+                            format_func=lambda i: f"{traces[i].label} at {time.strftime('%H:%M:%S', time.localtime(traces[i].started_at))}")
+    st.dataframe([{
+        "Method": totals['method'],
+        "Calls": totals['calls'],
+        "Round trips": totals['round_trips'],
+        "Rows": totals['rows'],
+        "KB": round(totals['payload_bytes'] / 1024, 1),
+        "Total ms": round(totals['total_ms'], 1),
+        "Max ms": round(totals['max_ms'], 1),
+        "Called from": ", ".join(totals['callers'])
+    } for totals in traces[selected].by_method()], use_container_width=True, hide_index=True)
+    st.download_button("Download as JSON", dump_traces(traces), file_name="reedz-traces.json", mime="application/json")
+
 def member_page():
     st.header("Reedz - Member Dashboard")
     user = db.get_user_by_id(st.session_state.user_id)
+    st.session_state.user = user
     col1, col2 = st.columns([2, 1])
     with col1:
         st.subheader(f"Welcome, {user.username}!")
@@ -76,6 +147,28 @@ def member_page():
         if st.button("Logout"):
             logout()
     st.metric("Reedz Balance", user.reedz_balance)
+    series = db.get_week_series(user.id)
+    if series and series.totals:
+        with st.expander("Season so far", expanded=True):
+            weeks = list(range(1, len(series.totals) + 1))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.caption("Reedz earned")
+                st.line_chart({"Week": weeks, "Reedz earned": series.totals}, x="Week")
+            with col2:
+                st.caption("Rank (lower is better)")
+                st.line_chart({"Week": weeks, "Rank": series.ranks}, x="Week")
+    with st.expander("Reedz history"):
+        history = [{
+            "When": entry.created_at,
+            "Change": entry.delta,
+            "Source": entry.source.value.replace("_", " "),
+            "Bet": entry.bet_id
+        } for entry in db.get_reedz_history(user.id, 50)]
+        if history:
+            st.dataframe(history, use_container_width=True, hide_index=True)
+        else:
+            st.info("No Reedz earned yet")
 
     st.subheader("Available Bets")
     open_bets = db.get_bets_by_status(BetStatus.OPEN)
@@ -87,13 +180,14 @@ def member_page():
             "Type": get_answer_type_enum(getattr(bet, "answertype", None)).value,
             "Status": bet.status.value
         } for bet in open_bets]
-        st.dataframe(pd.DataFrame(bet_table), use_container_width=True, hide_index=True)
+        st.dataframe(bet_table, use_container_width=True, hide_index=True)
     else:
         st.info("No open bets available")
 
+    my_predictions = db.get_predictions_for_user_bets(st.session_state.user_id, [bet.id for bet in open_bets])
     for bet in open_bets:
         bet_type = get_answer_type_enum(getattr(bet, "answertype", None))
-        existing_prediction = db.get_prediction_by_user_bet(st.session_state.user_id, bet.id)
+        existing_prediction = my_predictions.get(bet.id)
         if existing_prediction:
             st.info(f"You predicted: {existing_prediction.answer} for '{bet.title}' (Week {bet.week})")
         else:
@@ -105,7 +199,7 @@ def member_page():
             else:
                 answer = st.radio("Your prediction:", ["YES", "NO", "UNKNOWN"], key=f"bet_{bet.id}_choice")
             if st.button("Submit Prediction", key=f"submit_{bet.id}"):
-                success, message, _ = db.create_prediction(bet.id, st.session_state.user_id, answer)
+                success, message = betting.submit_prediction(st.session_state.user, bet.id, answer)
                 if success:
                     st.success("Prediction submitted!")
                     st.rerun()
@@ -113,22 +207,104 @@ def member_page():
                     st.error(message)
 
     st.subheader("Leaderboard")
-    users = db.get_all_users()
-    leaderboard_data = []
-    for idx, u in enumerate(users[:10], 1):
-        leaderboard_data.append({
-            "Rank": idx,
-            "Username": u.username,
-            "Reedz": u.reedz_balance
-        })
-    if leaderboard_data:
-        st.dataframe(pd.DataFrame(leaderboard_data), use_container_width=True, hide_index=True)
-    else:
-        st.info("No users on leaderboard")
+    show_leaderboard("member")
+
+def payout_table(candidate, participants):
+    """One row per prediction for a previewed answer, ranked by Reedz earned"""
+    scores = candidate['scores']
+    table = sorted(({
+        "Username": p['username'],
+        "Answer": p['answer'],
+        "Reedz": scores.get(p['id'], 0)
+    } for p in participants), key=lambda row: -row["Reedz"])
+    for position, row in enumerate(table):
+        tied = position and table[position - 1]["Reedz"] == row["Reedz"]
+        row["Rank"] = table[position - 1]["Rank"] if tied else position + 1
+    return table
+
+def preview_payouts(bet_id, bet_type, correct_answer):
+    """What-if payouts for the Resolve Bet tab; never writes to the database"""
+    candidates = [correct_answer] if correct_answer else []
+    if bet_type == AnswerType.NUMERIC and st.checkbox("Sweep a range of answers", key="preview_sweep"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            low = st.number_input("From", value=0.0, key="preview_low")
+        with col2:
+            high = st.number_input("To", value=100.0, key="preview_high")
+        with col3:
+            step = st.number_input("Step", value=1.0, min_value=0.001, key="preview_step")
+        count = int((high - low) / step) + 1 if high >= low else 0
+        if count > MAX_PREVIEW_CANDIDATES:
+            st.warning(f"Sweeping the first {MAX_PREVIEW_CANDIDATES} of {count} answers")
+            count = MAX_PREVIEW_CANDIDATES
+        # 15 significant digits keep distinct answers apart without float noise like 0.30000000000000004
+        candidates = list(dict.fromkeys(f"{low + i * step:.15g}" for i in range(count)))
+    if not candidates:
+        st.info("Enter a correct answer to preview payouts")
+        return
+
+    success, message, preview = scoring.preview_resolution(bet_id, candidates)
+    if not success:
+        st.error(message)
+        return
+    previews = preview['previews']
+    if len(previews) == 1:
+        st.metric("Total Reedz distributed", previews[0]['total_reedz_distributed'])
+        st.dataframe(payout_table(previews[0], preview['predictions']), use_container_width=True, hide_index=True)
+        return
+
+    def top_scorers(scores):
+        top = max(scores.values(), default=0)
+        return ", ".join(p['username'] for p in preview['predictions'] if top and scores.get(p['id']) == top)
+
+    sweep_table = [{
+        "Answer": float(p['correct_answer']),
+        "Reedz distributed": p['total_reedz_distributed'],
+        "Exact answers": p['exact_answers'],
+        "Top scorers": top_scorers(p['scores'])
+    } for p in previews]
+    st.line_chart(sweep_table, x="Answer", y="Reedz distributed")
+    st.dataframe(sweep_table, use_container_width=True, hide_index=True)
+    by_answer = {p['correct_answer']: p for p in previews}
+    selected = st.selectbox("Payouts if the answer is", list(by_answer), key="preview_selected")
+    st.dataframe(payout_table(by_answer[selected], preview['predictions']), use_container_width=True, hide_index=True)
+
+def queue_resolution(result):
+    """Remember a worker task for this session so its progress is shown"""
+    success, message, task_id = result
+    if not success:
+        st.error(message)
+        return
+    if task_id not in st.session_state.resolve_tasks:
+        st.session_state.resolve_tasks.append(task_id)
+    st.rerun()
+
+def resolution_progress():
+    """Progress of this session's queued resolutions; True while any is still running"""
+    tasks = worker.get_tasks(st.session_state.resolve_tasks)
+    for task in tasks:
+        if task.status == "done":
+            st.success(f"{task.label}: {task.message}")
+        elif task.status == "failed":
+            st.error(f"{task.label}: {task.message}")
+        elif task.credits_total:
+            st.progress(task.credits_applied / task.credits_total,
+                        text=f"{task.label}: credited {task.credits_applied} of {task.credits_total} balances")
+        elif task.predictions_total:
+            st.progress(task.predictions_scored / task.predictions_total,
+                        text=f"{task.label}: scored {task.predictions_scored} of {task.predictions_total} predictions")
+        else:
+            st.progress(0.0, text=f"{task.label}: {task.status}")
+    running = any(not task.finished for task in tasks)
+    if tasks and not running and st.button("Clear finished"):
+        st.session_state.resolve_tasks = []
+        st.rerun()
+    return running
 
 def admin_page():
     st.header("Reedz - Admin Dashboard")
     user = db.get_user_by_id(st.session_state.user_id)
+    st.session_state.user = user
     col1, col2 = st.columns([2, 1])
     with col1:
         st.subheader(f"Welcome, Admin {user.username}!")
@@ -136,7 +312,7 @@ def admin_page():
         if st.button("Logout"):
             logout()
 
-    admin_tabs = st.tabs(["Create Bet", "Close Bet", "Resolve Bet", "User Management", "Member Features"])
+    admin_tabs = st.tabs(["Create Bet", "Close Bet", "Resolve Bet", "User Management", "Member Features", "Performance"])
 
     with admin_tabs[0]:
         st.subheader("Create New Bet")
@@ -171,7 +347,7 @@ def admin_page():
                 "Type": get_answer_type_enum(getattr(b, "answertype", None)).value,
                 "Status": b.status.value
             } for b in open_bets]
-            st.dataframe(pd.DataFrame(bet_table), use_container_width=True, hide_index=True)
+            st.dataframe(bet_table, use_container_width=True, hide_index=True)
             bet_options = {f"Week {b.week}: {b.title}": b.id for b in open_bets}
             selected_bet = st.selectbox("Select bet to close", list(bet_options.keys()))
             if st.button("Close Bet"):
@@ -187,6 +363,7 @@ def admin_page():
 
     with admin_tabs[2]:
         st.subheader("Resolve Bet")
+        resolving = resolution_progress()
         closed_bets = db.get_bets_by_status(BetStatus.CLOSED)
         if closed_bets:
             bet_table = [{
@@ -196,11 +373,11 @@ def admin_page():
                 "Type": get_answer_type_enum(getattr(b, "answertype", None)).value,
                 "Status": b.status.value
             } for b in closed_bets]
-            st.dataframe(pd.DataFrame(bet_table), use_container_width=True, hide_index=True)
-            bet_options = {f"Week {b.week}: {b.title}": b.id for b in closed_bets}
+            st.dataframe(bet_table, use_container_width=True, hide_index=True)
+            bet_options = {f"Week {b.week}: {b.title}": b for b in closed_bets}
             selected_bet_title = st.selectbox("Select bet to resolve", list(bet_options.keys()))
-            selected_bet_id = bet_options[selected_bet_title]
-            selected_bet = db.get_bet_by_id(selected_bet_id)
+            selected_bet = bet_options[selected_bet_title]
+            selected_bet_id = selected_bet.id
             bet_type = get_answer_type_enum(getattr(selected_bet, "answertype", None))
 
             if bet_type == AnswerType.NUMERIC:
@@ -210,13 +387,23 @@ def admin_page():
             else:
                 correct_answer = st.radio("Correct answer:", ["YES", "NO", "UNKNOWN"])
 
+            with st.expander("Preview payouts"):
+                preview_payouts(selected_bet_id, bet_type, correct_answer)
+
             if st.button("Resolve Bet"):
-                success, message = db.resolve_bet(selected_bet_id, correct_answer)
-                if success:
-                    st.success(message)
-                    st.rerun()
-                else:
-                    st.error(message)
+                queue_resolution(worker.submit_bet(user, selected_bet_id, correct_answer))
+
+            with st.expander("Resolve a whole week"):
+                weeks = sorted({b.week for b in closed_bets})
+                week = st.selectbox("Week", weeks, key="resolve_week")
+                week_answers = {}
+                for b in [b for b in closed_bets if b.week == week]:
+                    if get_answer_type_enum(getattr(b, "answertype", None)) in (AnswerType.NUMERIC, AnswerType.TEXT):
+                        week_answers[b.id] = st.text_input(f"Correct answer for '{b.title}':", key=f"week_answer_{b.id}")
+                    else:
+                        week_answers[b.id] = st.radio(f"Correct answer for '{b.title}':", ["YES", "NO", "UNKNOWN"], key=f"week_answer_{b.id}")
+                if st.button(f"Resolve Week {week}"):
+                    queue_resolution(worker.submit_week(user, week, week_answers))
         else:
             st.info("No closed bets")
 
@@ -255,7 +442,7 @@ def admin_page():
                     )
                     if new_balance != u.reedz_balance:
                         difference = new_balance - u.reedz_balance
-                        success, msg = db.update_user_reedz(u.id, difference)
+                        success, msg, _ = db.increment_reedz({u.id: difference}, LedgerSource.ADMIN_ADJUSTMENT)
                         if success:
                             st.success("✓")
                             st.rerun()
@@ -292,6 +479,18 @@ def admin_page():
                             if st.button("No", key=f"cancel_del_{u.id}"):
                                 st.info("Cancelled")
 
+            st.divider()
+            with st.expander("Start a new season"):
+                st.write("Zeroes every active balance. Past ledger entries are kept.")
+                confirm_reset = st.checkbox("I want to reset all balances", key="confirm_season_reset")
+                if st.button("Reset Season", disabled=not confirm_reset):
+                    success, message = db.reset_season()
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+
     with admin_tabs[4]:
         st.subheader("Make Predictions (Member Features)")
         st.write("As an admin, you can also participate in betting:")
@@ -304,10 +503,11 @@ def admin_page():
                 "Type": get_answer_type_enum(getattr(bet, "answertype", None)).value,
                 "Status": bet.status.value
             } for bet in open_bets]
-            st.dataframe(pd.DataFrame(bet_table), use_container_width=True, hide_index=True)
+            st.dataframe(bet_table, use_container_width=True, hide_index=True)
+            my_predictions = db.get_predictions_for_user_bets(st.session_state.user_id, [bet.id for bet in open_bets])
             for bet in open_bets:
                 bet_type = get_answer_type_enum(getattr(bet, "answertype", None))
-                existing_prediction = db.get_prediction_by_user_bet(st.session_state.user_id, bet.id)
+                existing_prediction = my_predictions.get(bet.id)
                 if existing_prediction:
                     st.info(f"You predicted: {existing_prediction.answer} for '{bet.title}' (Week {bet.week})")
                 else:
@@ -319,7 +519,7 @@ def admin_page():
                     else:
                         answer = st.radio("Your prediction:", ["YES", "NO", "UNKNOWN"], key=f"admin_bet_{bet.id}_choice")
                     if st.button("Submit Prediction", key=f"admin_submit_{bet.id}"):
-                        success, message, _ = db.create_prediction(bet.id, st.session_state.user_id, answer)
+                        success, message = betting.submit_prediction(st.session_state.user, bet.id, answer)
                         if success:
                             st.success("Prediction submitted!")
                             st.rerun()
@@ -329,26 +529,31 @@ def admin_page():
             st.info("No open bets available")
 
         st.subheader("Leaderboard")
-        users = db.get_all_users()
-        leaderboard_data = []
-        for idx, u in enumerate(users[:10], 1):
-            leaderboard_data.append({
-                "Rank": idx,
-                "Username": u.username,
-                "Reedz": u.reedz_balance
-            })
-        if leaderboard_data:
-            st.dataframe(pd.DataFrame(leaderboard_data), use_container_width=True, hide_index=True)
+        show_leaderboard("admin")
+
+    with admin_tabs[5]:
+        st.subheader("Performance")
+        show_performance()
+
+    # Poll queued resolutions once the rest of the page is drawn
+    if resolving:
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
 
 def main():
     if st.session_state.user is None:
-        st.title("Reedz")
-        login_page()
+        page = login_page
+    elif st.session_state.role == UserRole.ADMIN:
+        page = admin_page
     else:
-        if st.session_state.role == UserRole.ADMIN:
-            admin_page()
-        else:
-            member_page()
+        page = member_page
+    user = st.session_state.user
+    # Rows loaded during this script run are reused for later lookups in the same run,
+    # and every backend call it makes is traced for the Performance tab
+    with trace_run(f"{page.__name__} ({user.username if user else 'anonymous'})"), db.request_scope():
+        if page is login_page:
+            st.title("Reedz")
+        page()
 
 if __name__ == "__main__":
     main()
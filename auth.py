@@ -1,10 +1,8 @@
 import hashlib
 import hmac
-from supabase_db import SupabaseDatabase
+from database import get_database
 from models import UserRole
 
-db = SupabaseDatabase()
-
 def hash_password(password: str) -> str:
     """Hash password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -24,6 +22,7 @@ def register_user(username: str, password: str, role: UserRole = UserRole.MEMBER
     if len(password) < 6:
         return False, "Password must be at least 6 characters", 0
     
+    db = get_database()
     # Check if user exists
     existing_user = db.get_user_by_username(username)
     if existing_user:
@@ -40,7 +39,7 @@ def login_user(username: str, password: str) -> tuple[bool, str, int]:
     if not username or not password:
         return False, "Username and password required", 0
     
-    user = db.get_user_by_username(username)
+    user = get_database().get_user_by_username(username)
     if not user:
         return False, "Invalid username or password", 0
     
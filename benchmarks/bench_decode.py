@@ -0,0 +1,152 @@
+"""
+Benchmark the row decoders in database.py against the original per-field decoding.
+
+Checks both build equal models, then times decoding a season of bet and
+prediction rows and measures the memory the decoded models hold.
+
+    python benchmarks/bench_decode.py [--sizes 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import AnswerType, BetStatus  # noqa: E402
+from database import bets_from_rows, predictions_from_rows  # noqa: E402
+
+
+@dataclass
+class LegacyBet:
+    id: int
+    week: int
+    title: str
+    description: Optional[str]
+    status: BetStatus
+    answertype: AnswerType
+    correct_answer: Optional[str]
+    created_at: str
+    closed_at: Optional[str]
+    resolved_at: Optional[str]
+    creator_id: Optional[int]
+
+
+@dataclass
+class LegacyPrediction:
+    id: int
+    bet_id: int
+    user_id: int
+    answer: str
+    points_earned: int
+    created_at: str
+
+
+def legacy_bets(rows: List[dict]) -> List[LegacyBet]:
+    """The pre-slots decoding, kept as the reference"""
+    bets = []
+    for row in rows:
+        try:
+            answertype = AnswerType(row["answertype"])
+        except Exception:
+            answertype = AnswerType.UNKNOWN
+        bet_status = BetStatus(row["status"]) if row.get("status") else BetStatus.OPEN
+        bets.append(LegacyBet(
+            id=row["id"],
+            week=row["week"],
+            title=row["title"],
+            description=row.get("description"),
+            status=bet_status,
+            answertype=answertype,
+            correct_answer=row.get("correct_answer"),
+            created_at=row.get("created_at"),
+            closed_at=row.get("closed_at"),
+            resolved_at=row.get("resolved_at"),
+            creator_id=row.get("creator_id")
+        ))
+    return bets
+
+
+def legacy_predictions(rows: List[dict]) -> List[LegacyPrediction]:
+    predictions = []
+    for row in rows:
+        predictions.append(LegacyPrediction(
+            id=row["id"],
+            bet_id=row["bet_id"],
+            user_id=row["user_id"],
+            answer=row["answer"],
+            points_earned=row["points_earned"],
+            created_at=row["created_at"]
+        ))
+    return predictions
+
+
+def make_bet_rows(n: int, rng: random.Random) -> List[dict]:
+    answertypes = [t.value for t in AnswerType] + ["legacy"]
+    return [{
+        "id": i + 1, "week": i // 20 + 1, "title": f"Bet {i + 1}", "description": "x" * rng.randint(0, 80),
+        "status": rng.choice([s.value for s in BetStatus]), "answertype": rng.choice(answertypes),
+        "correct_answer": None, "created_at": "2024-09-01T00:00:00+00:00", "closed_at": None,
+        "resolved_at": None, "creator_id": 1
+    } for i in range(n)]
+
+
+def make_prediction_rows(n: int, rng: random.Random) -> List[dict]:
+    return [{
+        "id": i + 1, "bet_id": i // 40 + 1, "user_id": i % 40 + 1, "answer": str(rng.randint(0, 60)),
+        "points_earned": rng.randint(0, 26), "created_at": "2024-09-01T00:00:00+00:00"
+    } for i in range(n)]
+
+
+def same(legacy: list, decoded: list) -> bool:
+    fields = type(decoded[0]).__slots__
+    return len(legacy) == len(decoded) and all(getattr(a, f) == getattr(b, f) for a, b in zip(legacy, decoded) for f in fields)
+
+
+def best_of(repeat: int, func, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def held_bytes(func, *args) -> int:
+    """Bytes still allocated by func's result once it returns"""
+    tracemalloc.start()
+    result = func(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'model':<11} {'rows':>7} {'legacy ms':>10} {'slots ms':>9} {'speedup':>8} {'legacy MB':>10} {'slots MB':>9}")
+    for name, make_rows, legacy, decode in (("prediction", make_prediction_rows, legacy_predictions, predictions_from_rows),
+                                            ("bet", make_bet_rows, legacy_bets, bets_from_rows)):
+        for n in args.sizes:
+            rows = make_rows(n, rng)
+            if not same(legacy(rows), decode(rows)):
+                raise SystemExit(f"Mismatch decoding {n} {name} rows")
+            legacy_s = best_of(args.repeat, legacy, rows)
+            decode_s = best_of(args.repeat, decode, rows)
+            legacy_mb = held_bytes(legacy, rows) / 1e6
+            decode_mb = held_bytes(decode, rows) / 1e6
+            print(f"{name:<11} {n:>7} {legacy_s * 1000:>10.2f} {decode_s * 1000:>9.2f} {legacy_s / decode_s:>7.1f}x "
+                  f"{legacy_mb:>10.2f} {decode_mb:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark ScoringManager._calculate_scores against the original per-prediction loop.
+
+Checks both produce identical scores, then times them on synthetic bets.
+
+    python benchmarks/bench_scoring.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import AnswerType, Prediction  # noqa: E402
+from scoring import ScoringManager  # noqa: E402
+
+
+def loop_scores(predictions: List[Prediction], correct_answer: str, answer_type: AnswerType) -> Dict[int, int]:
+    """The pre-vectorization implementation, kept as the reference"""
+    scores = {}
+    if answer_type == AnswerType.NUMERIC:
+        correct_value = float(correct_answer)
+        differences = []
+        for pred in predictions:
+            try:
+                pred_value = float(pred.answer)
+                diff = abs(pred_value - correct_value)
+                differences.append((pred.id, diff, pred_value == correct_value))
+            except ValueError:
+                scores[pred.id] = 0
+        differences.sort(key=lambda x: x[1])
+        base_points = 21
+        current_rank = 0
+        previous_diff = None
+        for i, (pred_id, diff, is_exact) in enumerate(differences):
+            if previous_diff is None or diff != previous_diff:
+                current_rank = i
+            points = max(base_points - current_rank, 1)
+            if is_exact:
+                points += 5
+            scores[pred_id] = points
+            previous_diff = diff
+    else:
+        correct_lower = correct_answer.strip().lower()
+        for pred in predictions:
+            scores[pred.id] = 26 if pred.answer.strip().lower() == correct_lower else 0
+    return scores
+
+
+def make_predictions(n: int, answer_type: AnswerType, rng: random.Random) -> List[Prediction]:
+    predictions = []
+    for i in range(n):
+        if answer_type == AnswerType.NUMERIC:
+            roll = rng.random()
+            if roll < 0.01:
+                answer = "not a number"
+            elif roll < 0.5:
+                answer = str(rng.randint(0, 200))
+            else:
+                answer = f" {rng.uniform(0, 200):.1f}"
+        else:
+            answer = rng.choice(["Yes", "no ", " YES", "unknown", "Maybe"])
+        predictions.append(Prediction(i + 1, 1, i + 1, answer, 0, ""))
+    return predictions
+
+
+def best_of(repeat: int, func, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scoring = ScoringManager(db=None)
+    rng = random.Random(42)
+    print(f"{'type':<8} {'predictions':>11} {'loop ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for answer_type, correct in ((AnswerType.NUMERIC, "100"), (AnswerType.TEXT, "yes")):
+        for n in args.sizes:
+            predictions = make_predictions(n, answer_type, rng)
+            expected = loop_scores(predictions, correct, answer_type)
+            actual = scoring._calculate_scores(predictions, correct, answer_type)
+            if actual != expected:
+                raise SystemExit(f"Mismatch for {answer_type.value} with {n} predictions")
+            loop_s = best_of(args.repeat, loop_scores, predictions, correct, answer_type)
+            vector_s = best_of(args.repeat, scoring._calculate_scores, predictions, correct, answer_type)
+            print(f"{answer_type.value:<8} {n:>11} {loop_s * 1000:>10.2f} {vector_s * 1000:>10.2f} {loop_s / vector_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup-time benchmark built on `python -X importtime`.
+
+Imports each entry-point module in a fresh interpreter, reports its
+cumulative import time and heaviest dependencies, and fails if a module
+drags in a dependency that should only load on first use.
+
+    python benchmarks/bench_startup.py [--top 10] [--budget-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> dependencies it must not import at startup
+ENTRY_POINTS: Dict[str, Tuple[str, ...]] = {
+    "database": ("supabase", "pandas", "numpy"),
+    "auth": ("supabase", "pandas", "numpy"),
+    "betting": ("supabase", "pandas", "numpy"),
+    "scoring": ("supabase", "pandas", "numpy"),
+    "main": ("supabase", "pandas", "numpy", "streamlit"),
+}
+
+
+def import_times(module: str) -> List[Tuple[str, int]]:
+    """(package, cumulative microseconds) for `module` and everything it imports"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        depth = len(package) - len(package.lstrip())
+        rows.append((package.strip(), depth, int(cumulative)))
+    # importtime prints children before their parent; keep only the subtree
+    # rooted at `module`, not what the interpreter imported during startup
+    root = max(i for i, (package, _, _) in enumerate(rows) if package == module)
+    times = [(module, rows[root][2])]
+    for package, depth, cumulative in reversed(rows[:root]):
+        if depth <= rows[root][1]:
+            break
+        times.append((package, cumulative))
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports to list per module")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a module takes longer")
+    args = parser.parse_args()
+
+    failures = []
+    for module, forbidden in ENTRY_POINTS.items():
+        times = import_times(module)
+        total_ms = dict(times)[module] / 1000
+        loaded = {package.split(".")[0] for package, _ in times}
+        print(f"{module:<10} {total_ms:8.1f} ms")
+        for package, cumulative in sorted(times, key=lambda t: -t[1])[1:args.top + 1]:
+            print(f"    {package:<40} {cumulative / 1000:8.1f} ms")
+        for dependency in forbidden:
+            if dependency in loaded:
+                failures.append(f"{module} imports {dependency} at startup")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            failures.append(f"{module} took {total_ms:.1f} ms (budget {args.budget_ms} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
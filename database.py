@@ -0,0 +1,483 @@
+"""
+Storage backend interface and backend selection
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from itertools import starmap
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from models import User, PublicUser, LeaderboardRow, Bet, Prediction, LedgerEntry, ResolutionJob, WeekSeries, UserRole, BetStatus, AnswerType, JobStatus, LedgerSource
+from query_cache import QueryCache, cached, shared_cache
+from identity_map import IdentityScope
+
+# Seconds a cached read may be served before refetching
+USER_TTL = 30
+BET_TTL = 60
+# Frozen week standings never change once written
+FROZEN_TTL = 3600
+# Rows fetched per round trip by the streaming iter_* reads
+PAGE_SIZE = int(os.getenv("REEDZ_PAGE_SIZE", "500"))
+# Most rows PostgREST returns per request (its max-rows setting; 1000 on Supabase)
+POSTGREST_MAX_ROWS = int(os.getenv("REEDZ_POSTGREST_MAX_ROWS", "1000"))
+
+
+def user_tags(deltas: Dict[int, int], **_) -> List[str]:
+    """Cache tags for every user a batch of balance deltas touches"""
+    return [f"user:{user_id}" for user_id in deltas]
+
+
+def bet_prediction_tags(bet_ids: List[int], **_) -> List[str]:
+    """Cache tags for the predictions of every bet in a batched read"""
+    return [f"predictions:bet:{bet_id}" for bet_id in bet_ids]
+
+
+# Columns of PublicUser; list and session lookups never select password_hash
+PUBLIC_USER_COLUMNS = "id, username, role, reedz_balance, is_active"
+# Bet columns for lists that only render titles and selectors
+BET_LIST_COLUMNS = "id, week, title, answertype, status, correct_answer, created_at, closed_at, resolved_at, creator_id"
+
+
+# ==================== ROW DECODERS ====================
+# One decoder per table. Enum members are looked up in dicts built once and
+# columns are pulled with precompiled itemgetters, so decoding a row is a
+# single positional constructor call.
+
+_ROLES = {role.value: role for role in UserRole}
+_BET_STATUSES = {status.value: status for status in BetStatus}
+_ANSWER_TYPES = {answertype.value: answertype for answertype in AnswerType}
+_LEDGER_SOURCES = {source.value: source for source in LedgerSource}
+_JOB_STATUSES = {status.value: status for status in JobStatus}
+
+_user_fields = itemgetter("id", "username", "role", "reedz_balance", "is_active")
+_prediction_fields = itemgetter("id", "bet_id", "user_id", "answer", "points_earned", "created_at")
+_ledger_fields = itemgetter("id", "user_id", "delta", "source", "created_at")
+
+
+def public_user_from_row(row: dict) -> PublicUser:
+    user_id, username, role, balance, is_active = _user_fields(row)
+    return PublicUser(user_id, username, _ROLES[role], balance, bool(is_active))
+
+
+def leaderboard_row(rank: int, row: dict, stats: dict) -> LeaderboardRow:
+    return LeaderboardRow(
+        rank=rank,
+        user_id=row["id"],
+        username=row["username"],
+        reedz_balance=row["reedz_balance"],
+        total_predictions=stats.get("total_predictions") or 0,
+        exact_answers=stats.get("exact_answers") or 0,
+        total_points=stats.get("total_points") or 0,
+        bets_resolved=stats.get("bets_resolved") or 0
+    )
+
+
+def user_from_row(row: dict) -> User:
+    user_id, username, role, balance, is_active = _user_fields(row)
+    return User(user_id, username, _ROLES[role], balance, bool(is_active), row["password_hash"])
+
+
+def bet_from_row(row: dict) -> Bet:
+    """Decode a bets row; columns a partial select left out (description, timestamps) are None"""
+    get = row.get
+    status = get("status")
+    # A missing status means OPEN; an unknown one is a bad row and raises
+    return Bet(row["id"], row["week"], row["title"], get("description"),
+               _BET_STATUSES[status] if status else BetStatus.OPEN,
+               _ANSWER_TYPES.get(get("answertype"), AnswerType.UNKNOWN),
+               get("correct_answer"), get("created_at"), get("closed_at"), get("resolved_at"), get("creator_id"))
+
+
+def bets_from_rows(rows: Iterable[dict]) -> List[Bet]:
+    return [bet_from_row(row) for row in rows]
+
+
+def prediction_from_row(row: dict) -> Prediction:
+    return Prediction(*_prediction_fields(row))
+
+
+def predictions_from_rows(rows: Iterable[dict]) -> List[Prediction]:
+    return list(starmap(Prediction, map(_prediction_fields, rows)))
+
+
+def ledger_from_row(row: dict) -> LedgerEntry:
+    entry_id, user_id, delta, source, created_at = _ledger_fields(row)
+    return LedgerEntry(entry_id, user_id, delta, _LEDGER_SOURCES[source], row.get("bet_id"), created_at)
+
+
+def series_from_row(row: dict) -> WeekSeries:
+    def array(value):
+        return json.loads(value) if isinstance(value, str) else list(value or [])
+    return WeekSeries(row["user_id"], array(row["points"]), array(row["totals"]), array(row["ranks"]))
+
+
+def job_from_row(row: dict) -> ResolutionJob:
+    scores = row["scores"]
+    if isinstance(scores, str):
+        scores = json.loads(scores)
+    return ResolutionJob(row["bet_id"], row["correct_answer"], _JOB_STATUSES[row["status"]],
+                         {int(pred_id): points for pred_id, points in scores.items()},
+                         row["credits_total"], row["credits_applied"], row["created_at"], row.get("completed_at"))
+
+
+# ==================== BET QUERIES ====================
+
+Timestamp = Union[str, datetime]
+
+
+def _timestamp(value: Timestamp) -> str:
+    """ISO text as stored by both backends; naive datetimes are taken as UTC"""
+    if isinstance(value, str):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class BetQuery:
+    """
+    Filters find_bets pushes down to the bets table; unset fields don't
+    filter. Week bounds are inclusive and time windows are [after, before).
+    summary=True leaves descriptions out (None) for selectors and filters.
+    """
+    week_from: Optional[int] = None
+    week_to: Optional[int] = None
+    statuses: Tuple[BetStatus, ...] = ()
+    creator_id: Optional[int] = None
+    created_after: Optional[Timestamp] = None
+    created_before: Optional[Timestamp] = None
+    closed_after: Optional[Timestamp] = None
+    closed_before: Optional[Timestamp] = None
+    resolved_after: Optional[Timestamp] = None
+    resolved_before: Optional[Timestamp] = None
+    limit: Optional[int] = None
+    summary: bool = False
+
+    def __post_init__(self):
+        object.__setattr__(self, "statuses", tuple(self.statuses))
+
+    def where(self, **filters) -> "BetQuery":
+        """A copy with more filters set, e.g. BetQuery(statuses=[CLOSED]).where(creator_id=1)"""
+        return replace(self, **filters)
+
+    def in_week(self, week: int) -> "BetQuery":
+        return self.where(week_from=week, week_to=week)
+
+    def conditions(self) -> List[Tuple[str, str, object]]:
+        """(column, operator, value) triples; operator is eq, in, gte, lte or lt"""
+        conditions = []
+        if self.week_from is not None:
+            conditions.append(("week", "gte", self.week_from))
+        if self.week_to is not None:
+            conditions.append(("week", "lte", self.week_to))
+        if len(self.statuses) == 1:
+            conditions.append(("status", "eq", self.statuses[0].value))
+        elif self.statuses:
+            conditions.append(("status", "in", [status.value for status in self.statuses]))
+        if self.creator_id is not None:
+            conditions.append(("creator_id", "eq", self.creator_id))
+        for column, after, before in (("created_at", self.created_after, self.created_before),
+                                      ("closed_at", self.closed_after, self.closed_before),
+                                      ("resolved_at", self.resolved_after, self.resolved_before)):
+            if after is not None:
+                conditions.append((column, "gte", _timestamp(after)))
+            if before is not None:
+                conditions.append((column, "lt", _timestamp(before)))
+        return conditions
+
+
+class Database(IdentityScope, ABC):
+    """Operations every storage backend provides"""
+
+    # Which sql/<dialect> migrations describe this backend's schema
+    dialect = ""
+    # Most rows one request can return, when the server truncates larger responses
+    max_page_size: Optional[int] = None
+
+    def __init__(self, cache: Optional[QueryCache] = None):
+        self.cache = cache
+
+    # ==================== USER OPERATIONS ====================
+
+    @abstractmethod
+    def create_user(self, username: str, password_hash: str, role: UserRole) -> Tuple[bool, str, Optional[int]]:
+        ...
+
+    @abstractmethod
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        """The full user including password_hash, for checking credentials"""
+
+    @abstractmethod
+    def get_user_by_id(self, user_id: int) -> Optional[PublicUser]:
+        ...
+
+    @abstractmethod
+    def get_all_users(self) -> List[PublicUser]:
+        """Active users, highest balance first"""
+
+    @abstractmethod
+    def get_leaderboard(self, limit: int = 10) -> List[LeaderboardRow]:
+        """Top active users by balance with their user_stats counters"""
+
+    @abstractmethod
+    def get_frozen_weeks(self) -> List[int]:
+        """Weeks whose final standings have been frozen, oldest first"""
+
+    @abstractmethod
+    def get_week_leaderboard(self, week: int, limit: Optional[int] = None) -> List[dict]:
+        """
+        Standings as of the end of a frozen week, read from its snapshot.
+        A week is frozen once every bet up to and including it is resolved;
+        unfrozen weeks return [].
+        """
+
+    @abstractmethod
+    def deactivate_user(self, user_id: int) -> Tuple[bool, str]:
+        ...
+
+    def iter_users(self, page_size: int = PAGE_SIZE) -> Iterator[PublicUser]:
+        """Active users in id order, one page at a time"""
+        return self._iter_pages("user_accounts", PUBLIC_USER_COLUMNS, {"is_active": True}, public_user_from_row, page_size)
+
+    # ==================== BET OPERATIONS ====================
+
+    @abstractmethod
+    def create_bet(self, week: int, title: str, description: str, answertype: str, creator_id: int) -> Tuple[bool, str, Optional[int]]:
+        ...
+
+    @abstractmethod
+    def get_bet_by_id(self, bet_id: int) -> Optional[Bet]:
+        ...
+
+    @abstractmethod
+    def get_bets_by_status(self, status: BetStatus) -> List[Bet]:
+        """Bets in a status, newest first"""
+
+    @abstractmethod
+    def get_all_bets(self) -> List[Bet]:
+        ...
+
+    def find_bets(self, query: BetQuery) -> List[Bet]:
+        """
+        Bets matching a BetQuery, newest first, filtered by the backend.
+        Full rows join the identity map; summary rows stay out of it.
+        """
+        bets = self._find_bets(query)
+        if not query.summary and self.identity_map is not None:
+            self.identity_map.add_all(bets)
+        return bets
+
+    @cached(BET_TTL, "bets")
+    def _find_bets(self, query: BetQuery) -> List[Bet]:
+        return bets_from_rows(self._bet_rows(query))
+
+    @abstractmethod
+    def _bet_rows(self, query: BetQuery) -> List[dict]:
+        """Raw bets rows matching query.conditions(), newest first, up to query.limit"""
+
+    def iter_bets(self, page_size: int = PAGE_SIZE) -> Iterator[Bet]:
+        """Every bet, newest first, one page at a time"""
+        return self._iter_pages("bets", "*", {}, bet_from_row, page_size, descending=True)
+
+    @abstractmethod
+    def close_bet(self, bet_id: int) -> Tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def resolve_bet(self, bet_id: int, correct_answer: str) -> Tuple[bool, str]:
+        """Record the answer and mark the bet resolved without scoring it"""
+
+    # ==================== RESOLUTION JOBS ====================
+
+    @abstractmethod
+    def get_resolution_jobs(self, bet_ids: List[int]) -> Dict[int, ResolutionJob]:
+        """Existing resolution jobs for the given bets, keyed by bet_id (never cached)"""
+
+    @abstractmethod
+    def create_resolution_jobs(self, jobs: Dict[int, Tuple[str, Dict[int, int], Dict[int, int]]]) -> Tuple[bool, str, Dict[int, ResolutionJob]]:
+        """
+        Start a job per bet from (correct answer, prediction_id -> points,
+        user_id -> delta). A bet that already has a job keeps it, so the first
+        snapshot always wins, and a bet that is not closed gets none.
+        Nothing is credited yet.
+        Returns the stored job of every given bet that has one, keyed by bet_id.
+        """
+
+    @abstractmethod
+    def apply_resolution_jobs(self, bet_ids: List[int], batch_size: int) -> Tuple[bool, str, Dict]:
+        """
+        Credit up to batch_size pending deltas of the given jobs in one
+        transaction, marking each applied so it is never credited twice. Once
+        none are pending, write the snapshots' prediction points and user_stats
+        and mark the bets resolved.
+        Returns: (success, message, {'applied', 'total', 'done'})
+        """
+
+    # ==================== PREDICTION OPERATIONS ====================
+
+    @abstractmethod
+    def create_prediction(self, bet_id: int, user_id: int, answer: str) -> Tuple[bool, str, Optional[int]]:
+        ...
+
+    @abstractmethod
+    def get_prediction_by_user_bet(self, user_id: int, bet_id: int) -> Optional[Prediction]:
+        ...
+
+    @abstractmethod
+    def get_predictions_for_user_bets(self, user_id: int, bet_ids: List[int]) -> Dict[int, Prediction]:
+        """A user's predictions on the given bets, keyed by bet_id"""
+
+    @abstractmethod
+    def get_predictions_by_bet(self, bet_id: int) -> List[Prediction]:
+        ...
+
+    @abstractmethod
+    def get_predictions_for_bets(self, bet_ids: List[int]) -> Dict[int, List[Prediction]]:
+        """Predictions on several bets in one query, grouped by bet_id"""
+
+    @abstractmethod
+    def get_predictions_by_user(self, user_id: int) -> List[Prediction]:
+        ...
+
+    def iter_predictions_by_user(self, user_id: int, page_size: int = PAGE_SIZE) -> Iterator[Prediction]:
+        """A user's predictions in id order, one page at a time"""
+        return self._iter_pages("predictions", "*", {"user_id": user_id}, prediction_from_row, page_size)
+
+    def iter_predictions_by_bet(self, bet_id: int, page_size: int = PAGE_SIZE) -> Iterator[Prediction]:
+        """A bet's predictions in id order, one page at a time"""
+        return self._iter_pages("predictions", "*", {"bet_id": bet_id}, prediction_from_row, page_size)
+
+    @abstractmethod
+    def get_user_bet_history(self, user_id: int, limit: Optional[int] = None) -> List[Tuple[Bet, Prediction]]:
+        """(Bet, Prediction) pairs for a user, newest week first"""
+
+    @abstractmethod
+    def get_bet_summary(self, bet_id: int) -> Optional[dict]:
+        """A bet with its predictions and their usernames (never password_hash)"""
+
+    @abstractmethod
+    def update_prediction_points(self, prediction_id: int, points: int) -> Tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def get_week_series(self, user_id: int) -> Optional[WeekSeries]:
+        """
+        A user's points, running total and rank for every resolved week, in
+        one read. Series are refreshed from the earliest affected week when
+        a resolution finishes.
+        """
+
+    # ==================== SCHEMA ====================
+
+    @abstractmethod
+    def get_schema_version(self) -> Optional[int]:
+        """Highest applied migration (0 if none), or None if schema_migrations can't be read"""
+
+    @abstractmethod
+    def get_index_columns(self) -> Optional[List[dict]]:
+        """
+        Every index on the app's tables as {'table_name', 'index_name',
+        'columns', 'is_unique'}, or None if they can't be listed
+        """
+
+    # ==================== KEYSET PAGING ====================
+
+    @abstractmethod
+    def _fetch_page(self, table: str, columns: str, filters: Dict[str, object], after_id: Optional[int],
+                    page_size: int, descending: bool) -> List[dict]:
+        """
+        Up to page_size rows of a table matching filters (column -> value),
+        ordered by id and starting just past after_id (None for the first page)
+        """
+
+    def _iter_pages(self, table: str, columns: str, filters: Dict[str, object], decode: Callable[[dict], object],
+                    page_size: int, descending: bool = False) -> Iterator:
+        """
+        Walk a table by id keyset, holding one page in memory at a time. Pages
+        bypass the query cache and identity map, and a failed page raises
+        rather than ending the walk early. page_size is capped at the
+        backend's max_page_size, so a short page always means the last one.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        if self.max_page_size:
+            page_size = min(page_size, self.max_page_size)
+        after_id = None
+        while True:
+            rows = self._fetch_page(table, columns, filters, after_id, page_size, descending)
+            for row in rows:
+                yield decode(row)
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1]["id"]
+
+    # ==================== REEDZ LEDGER ====================
+
+    @abstractmethod
+    def increment_reedz(self, deltas: Dict[int, int], source: LedgerSource = LedgerSource.ADMIN_ADJUSTMENT,
+                        bet_id: Optional[int] = None) -> Tuple[bool, str, Dict[int, int]]:
+        """
+        Append a ledger entry per user delta (insert-only, so concurrent
+        writers never lose each other's updates); returns user_id -> new balance
+        """
+
+    def update_user_reedz(self, user_id: int, amount: int) -> Tuple[bool, str]:
+        success, msg, balances = self.increment_reedz({user_id: amount})
+        if not success:
+            return False, msg
+        if user_id not in balances:
+            return False, "User not found"
+        return True, "Reedz balance updated"
+
+    @abstractmethod
+    def get_reedz_history(self, user_id: int, limit: Optional[int] = 50) -> List[LedgerEntry]:
+        """A user's ledger entries, newest first"""
+
+    @abstractmethod
+    def snapshot_balances(self, bet_ids: Optional[List[int]] = None) -> Tuple[bool, str]:
+        """
+        Fold ledger tails into new balance snapshots, so balance reads only
+        sum entries written since: of the users the given bets' resolutions
+        credited, or of every user. Only the folded users' writers wait.
+        """
+
+    @abstractmethod
+    def reset_season(self) -> Tuple[bool, str]:
+        """Zero every active user's balance with season_reset entries"""
+
+
+def create_database(cache: Optional[QueryCache] = None) -> Database:
+    """
+    Build the backend named by REEDZ_DB_BACKEND: "supabase" (default) or "sqlite".
+    The SQLite file is REEDZ_SQLITE_PATH (default reedz.db).
+    """
+    backend = os.getenv("REEDZ_DB_BACKEND", "supabase").lower()
+    if backend == "sqlite":
+        from sqlite_db import SqliteDatabase
+        return SqliteDatabase(os.getenv("REEDZ_SQLITE_PATH", "reedz.db"), cache=cache)
+    if backend == "supabase":
+        from supabase_db import SupabaseDatabase
+        return SupabaseDatabase(cache=cache)
+    raise ValueError(f"Unknown REEDZ_DB_BACKEND: {backend}")
+
+
+_database: Optional[Database] = None
+_database_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """
+    The process-wide database handle, built on first use with the shared
+    query cache. Building it makes no requests; the schema is checked by
+    `python migrations.py check` at deploy time, not here.
+    """
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = create_database(cache=shared_cache())
+    return _database
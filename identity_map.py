@@ -0,0 +1,92 @@
+"""
+Per-request identity map for the database layer
+"""
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class IdentityMap:
+    """Model instances loaded during one request, keyed by (model class, id)"""
+
+    def __init__(self):
+        self._rows: Dict[Tuple[type, Any], Any] = {}
+        self.hits = 0
+
+    def get(self, model: type, key: Any) -> Optional[Any]:
+        row = self._rows.get((model, key))
+        if row is not None:
+            self.hits += 1
+        return row
+
+    def add(self, obj: Any):
+        self._rows[(type(obj), obj.id)] = obj
+
+    def add_all(self, objs: Iterable[Any]):
+        for obj in objs:
+            if isinstance(obj, tuple):
+                self.add_all(obj)
+            elif obj is not None and hasattr(obj, "id"):
+                self.add(obj)
+
+    def clear(self):
+        self._rows.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class IdentityScope:
+    """Mixin giving a database handle a thread-local identity map for the duration of request_scope()"""
+
+    _local = threading.local()
+
+    @property
+    def identity_map(self) -> Optional[IdentityMap]:
+        return getattr(self._local, "identity_map", None)
+
+    @contextmanager
+    def request_scope(self):
+        """Serve repeated lookups from rows already loaded in this request; flushed on exit"""
+        if self.identity_map is not None:
+            yield self.identity_map
+            return
+        self._local.identity_map = IdentityMap()
+        try:
+            yield self._local.identity_map
+        finally:
+            self._local.identity_map = None
+
+
+def identity_lookup(model: type):
+    """Serve a get-by-id method from the active identity map, registering what it loads"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, key, *args, **kwargs):
+            identity = self.identity_map
+            if identity is None:
+                return func(self, key, *args, **kwargs)
+            row = identity.get(model, key)
+            if row is None:
+                row = func(self, key, *args, **kwargs)
+                if row is not None:
+                    identity.add(row)
+            return row
+        return wrapper
+    return decorator
+
+
+def identity_register(func):
+    """Register every model a list method returns in the active identity map"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        result = func(self, *args, **kwargs)
+        identity = self.identity_map
+        if identity is not None and result:
+            if isinstance(result, dict):
+                identity.add_all(result.values())
+            else:
+                identity.add_all(result if isinstance(result, list) else [result])
+        return result
+    return wrapper
@@ -3,24 +3,26 @@ Command-line interface for testing the Reedz platforms
 """
 
 
-from supabase_db import SupabaseDatabase
-from auth import AuthManager
+from database import get_database
 from betting import BettingManager
 from scoring import ScoringManager
 from models import UserRole, AnswerType, BetStatus
+from tracing import trace_run
 
 
 # Admin registration password
 ADMIN_REGISTRATION_PASSWORD = "reedz123"
 
+# Users listed before asking whether to show more
+USERS_PER_SCREEN = 50
+
 
 class ReedziCLI:
     """Command-line interface for Reedz platform"""
 
 
     def __init__(self):
-        self.db = SupabaseDatabase()
-        self.auth = AuthManager(self.db)
+        self.db = get_database()
         self.betting = BettingManager(self.db)
         self.scoring = ScoringManager(self.db)
         self.current_user = None
@@ -79,6 +81,13 @@ class ReedziCLI:
             print("12. Adjust User Reedz")
         print("\n0. Logout")
         choice = input("\nChoice: ").strip()
+        # Each command's backend calls are one trace (see REEDZ_TRACE_FILE)
+        with trace_run(f"cli menu {choice}"):
+            self.run_command(choice)
+
+
+    def run_command(self, choice: str):
+        """Dispatch a main menu choice"""
         if choice == '1':
             self.view_open_bets()
         elif choice == '2':
@@ -172,8 +181,8 @@ class ReedziCLI:
         print(f"\n{'Rank':<6} {'Username':<20} {'Reedz':<10} {'Predictions':<15} {'Exact':<10}")
         print("=" * 65)
         for entry in leaderboard:
-            print(f"{entry['rank']:<6} {entry['username']:<20} {entry['reedz_balance']:<10} "
-                  f"{entry['total_predictions']:<15} {entry['exact_answers']:<10}")
+            print(f"{entry.rank:<6} {entry.username:<20} {entry.reedz_balance:<10} "
+                  f"{entry.total_predictions:<15} {entry.exact_answers:<10}")
 
 
     def create_bet(self):
@@ -220,6 +229,16 @@ class ReedziCLI:
         print(f"\n{msg}")
 
 
+    def view_all_users(self):
+        print("\n--- All Users ---")
+        print(f"\n{'ID':<6} {'Username':<20} {'Role':<10} {'Reedz':<10}")
+        print("=" * 46)
+        for shown, user in enumerate(self.db.iter_users(page_size=USERS_PER_SCREEN), start=1):
+            print(f"{user.id:<6} {user.username:<20} {user.role.value:<10} {user.reedz_balance:<10}")
+            if shown % USERS_PER_SCREEN == 0 and input("More? (yes/no): ").strip().lower() != 'yes':
+                return
+
+
     def resolve_bet(self):
         print("\n--- Resolve Bet ---")
         closed_bets = self.db.get_bets_by_status(BetStatus.CLOSED)
@@ -0,0 +1,181 @@
+"""
+Versioned schema migrations for the Postgres (Supabase) and SQLite backends
+
+Migrations live in sql/<dialect>/NNNN_name.sql and are applied in version
+order, each recorded in schema_migrations. SQLite databases are migrated
+when they are opened; Postgres migrations are printed as one script for
+the Supabase SQL editor:
+
+    python migrations.py postgres [--from VERSION]
+    python migrations.py sqlite [PATH]
+    python migrations.py check
+
+`check` reports pending migrations and missing indexes for the configured
+backend and exits non-zero on problems. Run it as a deploy step; the app
+itself doesn't check, so starting it makes no schema requests.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import sqlite3
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+
+@dataclass(frozen=True)
+class IndexRequirement:
+    """An index a hot query needs: its leading columns, and whether it must be unique"""
+    table: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+    serves: str = ""
+
+
+REQUIRED_INDEXES = [
+    IndexRequirement("users", ("username",), unique=True, serves="login by username"),
+    IndexRequirement("users", ("is_active",), serves="active user lists"),
+    IndexRequirement("bets", ("status", "created_at"), serves="bets by status, newest first"),
+    IndexRequirement("predictions", ("user_id", "bet_id"), unique=True, serves="a user's predictions"),
+    IndexRequirement("predictions", ("bet_id",), serves="a bet's predictions"),
+    IndexRequirement("reedz_ledger", ("user_id", "id"), serves="balances from the ledger tail"),
+]
+
+
+def load_migrations(dialect: str) -> List[Migration]:
+    """Every migration for "postgres" or "sqlite", oldest first"""
+    directory = os.path.join(SQL_DIR, dialect)
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                migrations.append(Migration(int(match.group(1)), match.group(2), f.read()))
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+def latest_version(dialect: str) -> int:
+    migrations = load_migrations(dialect)
+    return migrations[-1].version if migrations else 0
+
+
+def migrate_sqlite(conn: "sqlite3.Connection") -> List[int]:
+    """Apply pending SQLite migrations, each in its own transaction. Returns the versions applied."""
+    conn.execute(
+        "create table if not exists schema_migrations ("
+        "version integer primary key, name text not null, "
+        "applied_at text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')))")
+    applied = {row[0] if isinstance(row, tuple) else row["version"]
+               for row in conn.execute("select version from schema_migrations").fetchall()}
+    done = []
+    for migration in load_migrations("sqlite"):
+        if migration.version in applied:
+            continue
+        # executescript commits first, so the explicit begin/commit keeps
+        # a migration and its schema_migrations row atomic
+        conn.executescript(
+            f"begin;\n{migration.sql}\n"
+            f"insert into schema_migrations (version, name) values ({migration.version}, '{migration.name}');\n"
+            "commit;")
+        done.append(migration.version)
+    return done
+
+
+def postgres_script(from_version: int = 0) -> str:
+    """The Postgres migrations after from_version as one script, each recording itself in schema_migrations"""
+    parts = ["create table if not exists schema_migrations (\n"
+             "    version int primary key,\n"
+             "    name text not null,\n"
+             "    applied_at timestamptz not null default now()\n"
+             ");"]
+    for migration in load_migrations("postgres"):
+        if migration.version <= from_version:
+            continue
+        parts.append(f"-- ==================== {migration.version:04d} {migration.name} ====================\n\n"
+                     f"{migration.sql.rstrip()}\n\n"
+                     f"insert into schema_migrations (version, name) values ({migration.version}, '{migration.name}')\n"
+                     "    on conflict (version) do nothing;")
+    return "\n\n".join(parts) + "\n"
+
+
+def missing_indexes(index_columns: List[dict]) -> List[IndexRequirement]:
+    """
+    Requirements no index satisfies. index_columns holds table_name, columns
+    and is_unique per index; an index serves a requirement when the required
+    columns lead it, and a unique one only when they are its whole key.
+    """
+    missing = []
+    for need in REQUIRED_INDEXES:
+        width = len(need.columns)
+        if not any(index["table_name"] == need.table
+                   and tuple(index["columns"][:width]) == need.columns
+                   and (not need.unique or (index["is_unique"] and len(index["columns"]) == width))
+                   for index in index_columns):
+            missing.append(need)
+    return missing
+
+
+def check_schema(db) -> List[str]:
+    """Problems with a database's schema: pending migrations and missing indexes"""
+    problems = []
+    latest = latest_version(db.dialect)
+    version = db.get_schema_version()
+    if version is None:
+        problems.append(f"schema_migrations is unreadable; run `python migrations.py {db.dialect}`")
+    elif version < latest:
+        problems.append(f"schema is at version {version} of {latest}; "
+                        f"run `python migrations.py {db.dialect} --from {version}`")
+    index_columns = db.get_index_columns()
+    if index_columns is None:
+        problems.append("indexes could not be listed (index_columns() arrives with migration 2)")
+        return problems
+    for need in missing_indexes(index_columns):
+        kind = "unique index" if need.unique else "index"
+        problems.append(f"missing {kind} on {need.table} ({', '.join(need.columns)}) for {need.serves}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    import sqlite3
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    postgres = commands.add_parser("postgres", help="print the Postgres migration script")
+    postgres.add_argument("--from", dest="from_version", type=int, default=0,
+                          help="skip migrations up to and including this version")
+    sqlite = commands.add_parser("sqlite", help="migrate a SQLite database")
+    sqlite.add_argument("path", nargs="?", default=os.getenv("REEDZ_SQLITE_PATH", "reedz.db"))
+    commands.add_parser("check", help="check the configured backend's schema")
+    args = parser.parse_args(argv)
+
+    if args.command == "postgres":
+        print(postgres_script(args.from_version), end="")
+    elif args.command == "sqlite":
+        conn = sqlite3.connect(args.path)
+        applied = migrate_sqlite(conn)
+        conn.close()
+        print(f"Applied {', '.join(map(str, applied))}" if applied else "Already up to date")
+    else:
+        from database import create_database
+        problems = check_schema(create_database())
+        for problem in problems:
+            print(problem)
+        if not problems:
+            print("Schema is up to date")
+        raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
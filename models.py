@@ -1,6 +1,6 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class UserRole(Enum):
@@ -21,18 +21,57 @@ class AnswerType(Enum):
     UNKNOWN = "unknown"
 
 
+class LedgerSource(Enum):
+    BET_RESOLUTION = "bet_resolution"
+    ADMIN_ADJUSTMENT = "admin_adjustment"
+    SEASON_RESET = "season_reset"
+    OPENING_BALANCE = "opening_balance"
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    DONE = "done"
+
+
 @dataclass
-class User:
+class PublicUser:
+    """A user without credentials: what session state, lists and the UI hold"""
+    __slots__ = ("id", "username", "role", "reedz_balance", "is_active")
     id: int
     username: str
-    password_hash: str
     role: UserRole
     reedz_balance: int
     is_active: bool
 
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+
+@dataclass
+class User(PublicUser):
+    """A user with their password hash; only loaded to check credentials"""
+    __slots__ = ("password_hash",)
+    password_hash: str
+
+
+@dataclass
+class LeaderboardRow:
+    __slots__ = ("rank", "user_id", "username", "reedz_balance", "total_predictions",
+                 "exact_answers", "total_points", "bets_resolved")
+    rank: int
+    user_id: int
+    username: str
+    reedz_balance: int
+    total_predictions: int
+    exact_answers: int
+    total_points: int
+    bets_resolved: int
+
 
 @dataclass
 class Bet:
+    __slots__ = ("id", "week", "title", "description", "status", "answertype", "correct_answer",
+                 "created_at", "closed_at", "resolved_at", "creator_id")
     id: int
     week: int
     title: str
@@ -48,9 +87,47 @@ class Bet:
 
 @dataclass
 class Prediction:
+    __slots__ = ("id", "bet_id", "user_id", "answer", "points_earned", "created_at")
     id: int
     bet_id: int
     user_id: int
     answer: str
     points_earned: int
     created_at: str
+
+
+@dataclass
+class LedgerEntry:
+    """One append-only change to a user's Reedz balance"""
+    __slots__ = ("id", "user_id", "delta", "source", "bet_id", "created_at")
+    id: int
+    user_id: int
+    delta: int
+    source: LedgerSource
+    bet_id: Optional[int]
+    created_at: str
+
+
+@dataclass
+class WeekSeries:
+    """A user's season by week: index i holds week i + 1"""
+    __slots__ = ("user_id", "points", "totals", "ranks")
+    user_id: int
+    points: List[int]
+    totals: List[int]
+    ranks: List[Optional[int]]
+
+
+@dataclass
+class ResolutionJob:
+    """A bet's resolution: the scores snapshot taken when it started, and how far crediting got"""
+    __slots__ = ("bet_id", "correct_answer", "status", "scores", "credits_total", "credits_applied",
+                 "created_at", "completed_at")
+    bet_id: int
+    correct_answer: str
+    status: JobStatus
+    scores: Dict[int, int]
+    credits_total: int
+    credits_applied: int
+    created_at: str
+    completed_at: Optional[str]
@@ -0,0 +1,161 @@
+"""
+Read-through query cache for the database layer
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+TagSpec = Union[str, Callable[..., Iterable[str]]]
+
+_MISSING = object()
+
+_local = threading.local()
+
+
+class QueryCache:
+    """Bounded LRU of query results with per-entry TTLs and tag-based invalidation"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, frozenset, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Any:
+        """Return the cached value or _MISSING, counting the hit/miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Tuple, value: Any, ttl: float, tags: Iterable[str] = ()):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of the given tags"""
+        wanted = set(tags)
+        with self._lock:
+            stale = [key for key, (_, entry_tags, _) in self._entries.items() if entry_tags & wanted]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+_shared_cache: Optional[QueryCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> QueryCache:
+    """The process-wide cache, so every database handle sees the same invalidations"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache()
+        return _shared_cache
+
+
+@contextmanager
+def uncached():
+    """Send the enclosed reads to the database, neither serving nor storing cached results"""
+    outer = getattr(_local, "bypass", False)
+    _local.bypass = True
+    try:
+        yield
+    finally:
+        _local.bypass = outer
+
+
+def _resolve_tags(specs: Tuple[TagSpec, ...], arguments: Dict[str, Any]) -> set:
+    tags = set()
+    for spec in specs:
+        if callable(spec):
+            tags.update(spec(**arguments))
+        else:
+            tags.add(spec.format(**arguments))
+    return tags
+
+
+def _freeze(value: Any) -> Any:
+    """Make list/set/dict arguments usable in a cache key"""
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    return value
+
+
+def _bind(func: Callable, self, args, kwargs) -> Dict[str, Any]:
+    bound = inspect.signature(func).bind(self, *args, **kwargs)
+    bound.apply_defaults()
+    return dict(list(bound.arguments.items())[1:])
+
+
+def cached(ttl: float, *tags: TagSpec):
+    """
+    Cache a read method on self.cache for ttl seconds.
+    Tags are format strings over the method's arguments (e.g. "user:{user_id}")
+    or callables taking those arguments and returning tag names.
+    None results are never cached, and reads inside uncached() skip the cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None or getattr(_local, "bypass", False):
+                return func(self, *args, **kwargs)
+            arguments = _bind(func, self, args, kwargs)
+            key = (func.__name__,) + tuple((name, _freeze(value)) for name, value in arguments.items())
+            value = cache.get(key)
+            if value is not _MISSING:
+                return value
+            value = func(self, *args, **kwargs)
+            if value is not None:
+                cache.set(key, value, ttl, _resolve_tags(tags, arguments))
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags: TagSpec):
+    """
+    Invalidate the given tags on self.cache after a write method runs.
+    Writes also flush the request's identity map, if one is active.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                cache = getattr(self, "cache", None)
+                if cache is not None:
+                    cache.invalidate(*_resolve_tags(tags, _bind(func, self, args, kwargs)))
+                identity = getattr(self, "identity_map", None)
+                if identity is not None:
+                    identity.clear()
+        return wrapper
+    return decorator
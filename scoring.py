@@ -1,62 +1,314 @@
 """
 Scoring and Reedz distribution logic
 """
-from typing import Tuple, List, Dict
-from supabase_db import SupabaseDatabase
-from models import User, Bet, Prediction, BetStatus, AnswerType
+import math
+import time
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Tuple
+from database import Database, BetQuery
+from query_cache import uncached
+from models import PublicUser, LeaderboardRow, Bet, Prediction, BetStatus, AnswerType, JobStatus, ResolutionJob
+
+# 1st place earns BASE_POINTS, each later place one less (never below 1);
+# an exact answer adds EXACT_BONUS on top
+BASE_POINTS = 21
+EXACT_BONUS = 5
+
+NAN = float("nan")
+
+# Pending credits applied per transaction while a resolution job runs, and
+# how many consecutive failed batches are retried (with doubling delays)
+# before giving up; the job resumes from its checkpoint on the next call
+RESOLVE_BATCH_SIZE = 500
+RESOLVE_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+# on_progress(stage, done, total): stage "scoring" counts predictions
+# scored, "crediting" counts user balances credited
+ProgressCallback = Callable[[str, int, int], None]
+
+# Upper bound on cells in one candidates x predictions block of a what-if sweep
+MAX_MATRIX_CELLS = 4_000_000
+
+
+def is_number(answer: str) -> bool:
+    """True if answer is a finite number; "nan" and "inf" parse as floats but can't be ranked"""
+    try:
+        return math.isfinite(float(answer))
+    except ValueError:
+        return False
+
+
+def _float_or_nan(answer: str) -> float:
+    try:
+        return float(answer)
+    except ValueError:
+        return NAN
+
+
+def _parse_numeric(answers: List[str]):
+    """
+    float() every answer; returns (values, parsed mask). Answers that fail
+    to parse or aren't finite are left out of the mask and score nothing.
+    """
+    import numpy as np
+
+    try:
+        # Casting from object calls float() on each element in C
+        values = np.array(answers, dtype=object).astype(np.float64)
+    except ValueError:
+        values = np.fromiter(map(_float_or_nan, answers), dtype=np.float64, count=len(answers))
+    return values, np.isfinite(values)
+
+
+_answer = attrgetter("answer")
+
+
+class _Positions(dict):
+    """Numbers keys in order of first lookup"""
+    def __missing__(self, key):
+        position = self[key] = len(self)
+        return position
+
+
+class _TextPoints(dict):
+    """Points per distinct text answer against one correct answer, computed on first lookup"""
+    def __init__(self, correct_answer: str):
+        super().__init__()
+        self.wanted = correct_answer.strip().lower()
+
+    def __missing__(self, answer: str) -> int:
+        points = self[answer] = BASE_POINTS + EXACT_BONUS if answer.strip().lower() == self.wanted else 0
+        return points
+
+
+def _competition_ranks(sorted_diffs):
+    """
+    0-based "min" ranks along the last axis of ascending differences:
+    ties share the rank of their first member
+    """
+    import numpy as np
+
+    n = sorted_diffs.shape[-1]
+    new_rank = np.ones(sorted_diffs.shape, dtype=bool)
+    new_rank[..., 1:] = sorted_diffs[..., 1:] != sorted_diffs[..., :-1]
+    return np.maximum.accumulate(np.where(new_rank, np.arange(n), 0), axis=-1)
+
+
+def _score_matrix(predictions: List[Prediction], candidates: List[str], answer_type: AnswerType):
+    """
+    Points for every (candidate answer, prediction) pair as a
+    (len(candidates), len(predictions)) int array. Answers are parsed and
+    normalized once, however many candidates are scored.
+    """
+    import numpy as np
+
+    points = np.zeros((len(candidates), len(predictions)), dtype=np.int64)
+    if answer_type == AnswerType.NUMERIC:
+        correct_values = np.array([float(c) for c in candidates], dtype=np.float64)[:, None]
+        values, parsed = _parse_numeric([p.answer for p in predictions])
+        columns = np.flatnonzero(parsed)
+        values = values[parsed]
+        # Bound the (candidates x predictions) temporaries for wide sweeps
+        block = max(1, MAX_MATRIX_CELLS // max(len(values), 1))
+        for start in range(0, len(candidates), block):
+            correct = correct_values[start:start + block]
+            diffs = np.abs(values - correct)
+            order = np.argsort(diffs, axis=1, kind="stable")
+            ranks = _competition_ranks(np.take_along_axis(diffs, order, axis=1))
+            ranked = np.maximum(BASE_POINTS - ranks, 1) + EXACT_BONUS * (values[order] == correct)
+            block_points = np.empty_like(ranked)
+            np.put_along_axis(block_points, order, ranked, axis=1)
+            points[start:start + block, columns] = block_points
+    else:
+        # Text bets have few distinct answers: one pass numbers them, each is
+        # normalized once and compared, then expanded to every prediction
+        positions = _Positions()
+        inverse = np.fromiter(map(positions.__getitem__, map(_answer, predictions)),
+                              dtype=np.intp, count=len(predictions))
+        normalized = np.array([a.strip().lower() for a in positions], dtype=object)
+        wanted = np.array([c.strip().lower() for c in candidates], dtype=object)[:, None]
+        points[(normalized == wanted)[:, inverse]] = BASE_POINTS + EXACT_BONUS
+    return points
+
+
+def _sum_by_user(predictions: List[Prediction], scores: Dict[int, int], deltas: Dict[int, int]) -> Dict[int, int]:
+    """Add each prediction's points to its owner's entry in deltas, so every balance is credited once"""
+    owners = {p.id: p.user_id for p in predictions}
+    for pred_id, points in scores.items():
+        if points:
+            user_id = owners[pred_id]
+            deltas[user_id] = deltas.get(user_id, 0) + points
+    return deltas
+
+
+def _answer_conflict(bet: Bet, job: ResolutionJob) -> str:
+    state = "was already resolved" if job.status == JobStatus.DONE else "is already being resolved"
+    return f"'{bet.title}' {state} with answer '{job.correct_answer}'"
+
 
 class ScoringManager:
     """Handle scoring and Reedz distribution"""
     
-    def __init__(self, db: SupabaseDatabase):
+    def __init__(self, db: Database):
         self.db = db
     
-    def resolve_bet(self, user: User, bet_id: int, correct_answer: str) -> Tuple[bool, str, Dict]:
+    def resolve_bet(self, user: PublicUser, bet_id: int, correct_answer: str,
+                    on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, Dict]:
         """
         Resolve a bet and distribute Reedz (admin only)
+        Runs as a resumable job: calling this again after a failure finishes
+        the job without paying anyone twice.
         Returns: (success, message, scoring_details)
         """
         if not user.is_admin():
             return False, "Only commissioners can resolve bets", {}
         
-        bet = self.db.get_bet(bet_id)
+        bet = self.db.get_bet_by_id(bet_id)
         if not bet:
             return False, "Bet not found", {}
-        if bet.status == BetStatus.RESOLVED:
-            return False, "Bet already resolved", {}
-        
-        success, msg = self.db.set_bet_answer(bet_id, correct_answer)
+        if bet.answertype == AnswerType.NUMERIC and not is_number(correct_answer):
+            return False, "Correct answer must be numeric for this bet", {}
+
+        success, msg, snapshots = self._start_jobs([bet], {bet_id: correct_answer}, on_progress)
+        if not success:
+            return False, msg, {}
+        success, msg = self._run_jobs([bet_id], on_progress)
         if not success:
             return False, msg, {}
 
-        predictions = self.db.get_predictions_for_bet(bet_id)
-        if len(predictions) == 0:
-            self.db.update_bet_status(bet_id, BetStatus.RESOLVED)
+        scores = snapshots[bet_id]
+        if not scores:
             return True, "Bet resolved (no predictions)", {}
+        total_distributed = sum(scores.values())
+        scoring_details = {
+            'total_predictions': len(scores),
+            'total_reedz_distributed': total_distributed,
+            'scores': scores
+        }
+        return True, f"Bet resolved! Distributed {total_distributed} Reedz", scoring_details
 
-        scores = self._calculate_scores(predictions, correct_answer, bet.answertype)
-
-        total_distributed = 0
-        # DEBUG: Print scoring and prediction IDs
-        print(f"Scoring: {scores}")
+    def resolve_week(self, user: PublicUser, week: int, answers: Dict[int, str],
+                     on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, Dict]:
+        """
+        Resolve every closed bet of a week at once (admin only)
+        answers maps bet_id -> correct answer and must cover each closed bet of the week.
+        All predictions are fetched in one query and the week's jobs are
+        credited together, a batch of users per transaction.
+        Returns: (success, message, scoring_details)
+        """
+        if not user.is_admin():
+            return False, "Only commissioners can resolve bets", {}
 
-        for pred_id, points in scores.items():
-            ok, update_msg = self.db.update_prediction_points(pred_id, points)
-            print(f"Updated prediction {pred_id} points: {points} | Success: {ok} | Msg: {update_msg}")
-            prediction = next((p for p in predictions if p.id == pred_id), None)
-            if prediction:
-                ok2, user_update_msg = self.db.update_user_reedz(prediction.user_id, points)
-                print(f"Updated user {prediction.user_id} Reedz (+{points}): Ok? {ok2} | Msg: {user_update_msg}")
-                total_distributed += points
+        bets = self.db.find_bets(BetQuery(statuses=[BetStatus.CLOSED], summary=True).in_week(week))
+        if not bets:
+            return False, f"No closed bets for week {week}", {}
+        if set(answers) - {b.id for b in bets}:
+            return False, f"Only closed bets of week {week} can be resolved", {}
+        for bet in bets:
+            correct_answer = answers.get(bet.id)
+            if not correct_answer:
+                return False, f"Missing correct answer for '{bet.title}'", {}
+            if bet.answertype == AnswerType.NUMERIC and not is_number(correct_answer):
+                return False, f"Correct answer for '{bet.title}' must be numeric", {}
 
-        self.db.update_bet_status(bet_id, BetStatus.RESOLVED)
+        success, msg, snapshots = self._start_jobs(bets, answers, on_progress)
+        if not success:
+            return False, msg, {}
+        success, msg = self._run_jobs([b.id for b in bets], on_progress)
+        if not success:
+            return False, msg, {}
 
+        bet_details = {bet_id: {
+            'total_predictions': len(scores),
+            'total_reedz_distributed': sum(scores.values())
+        } for bet_id, scores in snapshots.items()}
+        total_distributed = sum(d['total_reedz_distributed'] for d in bet_details.values())
         scoring_details = {
-            'total_predictions': len(predictions),
+            'bets_resolved': len(bets),
+            'total_predictions': sum(d['total_predictions'] for d in bet_details.values()),
             'total_reedz_distributed': total_distributed,
-            'scores': scores
+            'bets': bet_details
         }
-        return True, f"Bet resolved! Distributed {total_distributed} Reedz", scoring_details
+        return True, f"Week {week} resolved! {len(bets)} bets, distributed {total_distributed} Reedz", scoring_details
+
+    def _start_jobs(self, bets: List[Bet], answers: Dict[int, str],
+                    on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str, Dict[int, Dict[int, int]]]:
+        """
+        Create a resolution job for each bet that has none, snapshotting its scores.
+        A bet that already has a job keeps its snapshot, so a retry never rescores.
+        Returns: (success, message, bet_id -> prediction_id -> points)
+        """
+        jobs = self.db.get_resolution_jobs([b.id for b in bets])
+        snapshots = {}
+        for bet in bets:
+            job = jobs.get(bet.id)
+            if job:
+                if job.correct_answer != answers[bet.id]:
+                    return False, _answer_conflict(bet, job), {}
+                snapshots[bet.id] = job.scores
+            elif bet.status == BetStatus.RESOLVED:
+                return False, "Bet already resolved", {}
+            elif bet.status != BetStatus.CLOSED:
+                return False, f"Close '{bet.title}' before resolving it", {}
+
+        new_bets = [b for b in bets if b.id not in jobs]
+        if not new_bets:
+            return True, "Resuming resolution", snapshots
+        # The snapshot is what gets paid out, so it never comes from a cached read
+        with uncached():
+            predictions_by_bet = self.db.get_predictions_for_bets([b.id for b in new_bets])
+        total = sum(len(predictions_by_bet.get(b.id, [])) for b in new_bets)
+        scored = 0
+        new_jobs = {}
+        for bet in new_bets:
+            predictions = predictions_by_bet.get(bet.id, [])
+            scores = self._calculate_scores(predictions, answers[bet.id], bet.answertype) if predictions else {}
+            new_jobs[bet.id] = (answers[bet.id], scores, _sum_by_user(predictions, scores, {}))
+            snapshots[bet.id] = scores
+            scored += len(predictions)
+            if on_progress:
+                on_progress("scoring", scored, total)
+        success, msg, jobs = self.db.create_resolution_jobs(new_jobs)
+        if not success:
+            return False, msg, {}
+
+        # Another admin may have started the same bet meanwhile; the first job
+        # is kept, so work from the stored rows rather than our own scores
+        for bet in new_bets:
+            job = jobs.get(bet.id)
+            if not job:
+                # Jobs are only created for bets that are still closed in storage
+                return False, f"Close '{bet.title}' before resolving it", {}
+            if job.correct_answer != answers[bet.id]:
+                return False, _answer_conflict(bet, job), {}
+            snapshots[bet.id] = job.scores
+        return True, msg, snapshots
+
+    def _run_jobs(self, bet_ids: List[int], on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str]:
+        """
+        Credit the jobs' pending deltas a batch at a time until they are done.
+        Every batch is checkpointed, so failed batches are simply retried.
+        """
+        failures = 0
+        applied = -1
+        while True:
+            success, msg, progress = self.db.apply_resolution_jobs(bet_ids, RESOLVE_BATCH_SIZE)
+            if success and on_progress:
+                on_progress("crediting", progress['applied'], progress['total'])
+            if success and progress['done']:
+                # Fold the credited users' new entries into snapshots so their balance
+                # reads stay short; other users' ledger writes are never blocked
+                self.db.snapshot_balances(bet_ids)
+                return True, msg
+            if success and progress['applied'] > applied:
+                failures = 0
+                applied = progress['applied']
+                continue
+            failures += 1
+            if failures >= RESOLVE_ATTEMPTS:
+                return False, f"{msg}. Progress is saved; resolve again to resume."
+            time.sleep(RETRY_DELAY * 2 ** (failures - 1))
 
     def _calculate_scores(self, predictions: List[Prediction], correct_answer: str, answer_type: AnswerType) -> Dict[int, int]:
         """
@@ -70,56 +322,50 @@ class ScoringManager:
         - +5 bonus for exact answer
         - Ties: All tied users get the SAME points
         """
-        scores = {}
-        if answer_type == AnswerType.NUMERIC:
-            correct_value = float(correct_answer)
-            differences = []
-            for pred in predictions:
-                try:
-                    pred_value = float(pred.answer)
-                    diff = abs(pred_value - correct_value)
-                    differences.append((pred.id, diff, pred_value == correct_value))
-                except ValueError:
-                    scores[pred.id] = 0
-            differences.sort(key=lambda x: x[1])
-            base_points = 21
-            current_rank = 0
-            previous_diff = None
-            for i, (pred_id, diff, is_exact) in enumerate(differences):
-                if previous_diff is None or diff != previous_diff:
-                    current_rank = i
-                points = max(base_points - current_rank, 1)
-                if is_exact:
-                    points += 5
-                scores[pred_id] = points
-                previous_diff = diff
-        else:
-            correct_lower = correct_answer.strip().lower()
-            exact_matches = []
-            non_matches = []
-            for pred in predictions:
-                pred_lower = pred.answer.strip().lower()
-                if pred_lower == correct_lower:
-                    exact_matches.append(pred.id)
-                else:
-                    non_matches.append(pred.id)
-            for pred_id in exact_matches:
-                scores[pred_id] = 26
-            for pred_id in non_matches:
-                scores[pred_id] = 0
-        return scores
-
-    def get_leaderboard(self, limit: int = 10) -> List[Dict]:
-        users = self.db.get_all_users()
-        leaderboard = []
-        for i, user in enumerate(users[:limit], 1):
-            predictions = self.db.get_predictions_by_user(user.id)
-            exact_count = sum(1 for p in predictions if p.points_earned and p.points_earned >= 26)
-            leaderboard.append({
-                'rank': i,
-                'username': user.username,
-                'reedz_balance': user.reedz_balance,
-                'total_predictions': len(predictions),
-                'exact_answers': exact_count
-            })
-        return leaderboard
+        if answer_type != AnswerType.NUMERIC:
+            # One text answer: a dict lookup per prediction beats building a matrix row
+            points = _TextPoints(correct_answer)
+            return {p.id: points[p.answer] for p in predictions}
+        scores = _score_matrix(predictions, [correct_answer], answer_type)[0]
+        return dict(zip([p.id for p in predictions], scores.tolist()))
+
+    def preview_resolution(self, bet_id: int, candidates: List[str]) -> Tuple[bool, str, Dict]:
+        """
+        What-if payouts for several candidate correct answers, without writing anything.
+        The bet, its predictions and their usernames come from one summary read,
+        and every candidate is scored in one batch.
+        Returns: (success, message, {'predictions': [{'id', 'username', 'answer'}],
+                  'previews': one summary per candidate, scores keyed by prediction id})
+        """
+        summary = self.db.get_bet_summary(bet_id)
+        if not summary:
+            return False, "Bet not found", {}
+        bet = summary['bet']
+        if bet.answertype == AnswerType.NUMERIC and not all(map(is_number, candidates)):
+            return False, "Candidate answers must be numeric for this bet", {}
+
+        rows = summary['predictions']
+        participants = [{'id': row['id'], 'username': row['username'], 'answer': row['answer']} for row in rows]
+        if not rows or not candidates:
+            return True, "Nothing to preview", {'predictions': participants, 'previews': [{
+                'correct_answer': candidate,
+                'scores': {},
+                'total_reedz_distributed': 0,
+                'exact_answers': 0
+            } for candidate in candidates]}
+
+        predictions = [Prediction(row['id'], bet_id, row['user_id'], row['answer'], row['points_earned'], row['submitted_at'])
+                       for row in rows]
+        matrix = _score_matrix(predictions, candidates, bet.answertype)
+        pred_ids = [p.id for p in predictions]
+        totals = matrix.sum(axis=1).tolist()
+        exact = (matrix >= BASE_POINTS + EXACT_BONUS).sum(axis=1).tolist()
+        return True, f"Previewed {len(candidates)} answers", {'predictions': participants, 'previews': [{
+            'correct_answer': candidate,
+            'scores': dict(zip(pred_ids, row)),
+            'total_reedz_distributed': totals[i],
+            'exact_answers': exact[i]
+        } for i, (candidate, row) in enumerate(zip(candidates, matrix.tolist()))]}
+
+    def get_leaderboard(self, limit: int = 10) -> List[LeaderboardRow]:
+        return self.db.get_leaderboard(limit)
@@ -0,0 +1,451 @@
+-- Baseline: the schema as of the first versioned release. The core
+-- tables were created by hand before the project shipped its schema, so
+-- every statement here is idempotent and safe to run on an existing
+-- project; later changes go in new numbered files.
+
+create table if not exists users (
+    id bigint generated by default as identity primary key,
+    username text not null unique,
+    password_hash text not null,
+    role text not null default 'member',
+    is_active boolean not null default true
+);
+
+create table if not exists bets (
+    id bigint generated by default as identity primary key,
+    week int not null,
+    title text not null,
+    description text,
+    answertype text not null default 'unknown',
+    status text not null default 'open',
+    correct_answer text,
+    created_at timestamptz not null default now(),
+    closed_at timestamptz,
+    resolved_at timestamptz,
+    creator_id bigint references users (id) on delete set null
+);
+
+create table if not exists predictions (
+    id bigint generated by default as identity primary key,
+    bet_id bigint not null references bets (id) on delete cascade,
+    user_id bigint not null references users (id) on delete cascade,
+    answer text not null,
+    points_earned int not null default 0,
+    created_at timestamptz not null default now()
+);
+
+-- Per-user counters behind the leaderboard, maintained by delta:
+-- the trigger below on prediction insert/delete, apply_resolution_jobs
+-- when a bet resolves. An exact answer is one that earned 26+ points.
+create table if not exists user_stats (
+    user_id bigint primary key references users (id) on delete cascade,
+    total_predictions int not null default 0,
+    exact_answers int not null default 0,
+    total_points int not null default 0,
+    bets_resolved int not null default 0
+);
+
+insert into user_stats (user_id, total_predictions, exact_answers, total_points, bets_resolved)
+select p.user_id,
+       count(*),
+       count(*) filter (where b.status = 'resolved' and p.points_earned >= 26),
+       coalesce(sum(p.points_earned) filter (where b.status = 'resolved'), 0),
+       count(*) filter (where b.status = 'resolved')
+  from predictions p
+  join bets b on b.id = p.bet_id
+ group by p.user_id
+on conflict (user_id) do nothing;
+
+create or replace function track_prediction_count() returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into user_stats (user_id, total_predictions)
+        values (new.user_id, 1)
+        on conflict (user_id) do update
+           set total_predictions = user_stats.total_predictions + 1;
+        return new;
+    end if;
+    update user_stats
+       set total_predictions = total_predictions - 1
+     where user_id = old.user_id;
+    return old;
+end;
+$$;
+
+drop trigger if exists predictions_track_count on predictions;
+create trigger predictions_track_count
+    after insert or delete on predictions
+    for each row execute function track_prediction_count();
+
+-- Reedz balances are an append-only ledger of deltas. A balance is the
+-- user's latest snapshot plus the ledger entries written after it, so
+-- writers only ever insert and never contend on a balance row.
+-- source is bet_resolution, admin_adjustment, season_reset or
+-- opening_balance (balances carried over from users.reedz_balance).
+create table if not exists reedz_ledger (
+    id bigserial primary key,
+    user_id bigint not null references users (id) on delete cascade,
+    delta int not null,
+    source text not null,
+    bet_id bigint references bets (id) on delete set null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists reedz_ledger_user_idx
+    on reedz_ledger (user_id, id);
+
+create table if not exists reedz_snapshots (
+    user_id bigint not null references users (id) on delete cascade,
+    ledger_id bigint not null,
+    balance bigint not null,
+    created_at timestamptz not null default now(),
+    primary key (user_id, ledger_id)
+);
+
+do $$
+begin
+    if exists (select 1 from information_schema.columns
+                where table_name = 'users' and column_name = 'reedz_balance') then
+        insert into reedz_ledger (user_id, delta, source)
+        select id, reedz_balance, 'opening_balance'
+          from users
+         where reedz_balance <> 0;
+        alter table users drop column reedz_balance;
+    end if;
+end;
+$$;
+
+-- Users with their computed balance; every user read goes through here
+create or replace view user_accounts as
+select u.id, u.username, u.password_hash, u.role, u.is_active,
+       coalesce(s.balance, 0) + coalesce((
+           select sum(l.delta) from reedz_ledger l
+            where l.user_id = u.id and l.id > coalesce(s.ledger_id, 0)), 0) as reedz_balance
+  from users u
+  left join reedz_snapshots s on s.user_id = u.id
+   and s.ledger_id = (select max(ledger_id) from reedz_snapshots where user_id = u.id);
+
+-- Append a ledger entry per user delta and return the new balances.
+-- p_deltas maps user id -> delta; unknown users are skipped.
+drop function if exists increment_reedz(jsonb);
+
+create or replace function increment_reedz(
+    p_deltas jsonb,
+    p_source text default 'admin_adjustment',
+    p_bet_id bigint default null
+) returns table (id bigint, reedz_balance bigint)
+language sql
+as $$
+    insert into reedz_ledger (user_id, delta, source, bet_id)
+    select u.id, d.value::int, p_source, p_bet_id
+      from jsonb_each_text(p_deltas) d
+      join users u on u.id = d.key::bigint
+     where d.value::int <> 0;
+
+    select a.id::bigint, a.reedz_balance::bigint
+      from user_accounts a
+     where a.id in (select k::bigint from jsonb_object_keys(p_deltas) k);
+$$;
+
+-- Fold each user's ledger tail into a new snapshot; returns how many
+-- were taken. The share lock waits out in-flight ledger inserts, so no
+-- entry below a snapshot's ledger_id can commit after it.
+create or replace function snapshot_reedz()
+returns int
+language plpgsql
+as $$
+declare
+    taken int;
+begin
+    lock table reedz_ledger in share mode;
+    insert into reedz_snapshots (user_id, ledger_id, balance)
+    select a.id,
+           (select max(l.id) from reedz_ledger l where l.user_id = a.id),
+           a.reedz_balance
+      from user_accounts a
+     where (select max(l.id) from reedz_ledger l where l.user_id = a.id)
+         > coalesce((select max(s.ledger_id) from reedz_snapshots s where s.user_id = a.id), 0);
+    get diagnostics taken = row_count;
+    return taken;
+end;
+$$;
+
+-- Zero every active balance with season_reset entries, then snapshot
+create or replace function reset_reedz_season()
+returns int
+language plpgsql
+as $$
+declare
+    reset int;
+begin
+    lock table reedz_ledger in share row exclusive mode;
+    insert into reedz_ledger (user_id, delta, source)
+    select id, -reedz_balance, 'season_reset'
+      from user_accounts
+     where is_active and reedz_balance <> 0;
+    get diagnostics reset = row_count;
+    perform snapshot_reedz();
+    return reset;
+end;
+$$;
+
+-- Each user's season by week, one array-backed row per user: element
+-- i of points / totals / ranks is week i's points earned, running total
+-- and competition rank. Refreshed from the earliest week a resolution
+-- touched, so earlier weeks are never recomputed.
+create table if not exists user_week_series (
+    user_id bigint primary key references users (id) on delete cascade,
+    points int[] not null default '{}',
+    totals int[] not null default '{}',
+    ranks int[] not null default '{}',
+    updated_at timestamptz not null default now()
+);
+
+create or replace function refresh_week_series(p_from_week int)
+returns void
+language plpgsql
+as $$
+declare
+    from_week int;
+    last_week int;
+begin
+    -- Series are all the same length; never leave a gap after it
+    select least(p_from_week, coalesce(max(cardinality(totals)), 0) + 1)
+      into from_week
+      from user_week_series;
+    select coalesce(max(week), 0) into last_week from bets where status = 'resolved';
+    if last_week < from_week then
+        return;
+    end if;
+
+    with weekly as (
+        select p.user_id, b.week, sum(p.points_earned)::int as points
+          from predictions p
+          join bets b on b.id = p.bet_id
+         where b.status = 'resolved' and b.week >= from_week
+         group by p.user_id, b.week
+    ), members as (
+        select user_id from weekly
+        union
+        select user_id from user_week_series
+    ), grid as (
+        select m.user_id, w.week, coalesce(k.points, 0) as points
+          from members m
+         cross join generate_series(from_week, last_week) w (week)
+          left join weekly k on k.user_id = m.user_id and k.week = w.week
+    ), running as (
+        select g.user_id, g.week, g.points,
+               (coalesce(s.totals[from_week - 1], 0)
+                + sum(g.points) over (partition by g.user_id order by g.week))::int as total
+          from grid g
+          left join user_week_series s on s.user_id = g.user_id
+    ), ranked as (
+        select r.*, (rank() over (partition by r.week order by r.total desc))::int as rank
+          from running r
+    )
+    insert into user_week_series (user_id, points, totals, ranks)
+    select r.user_id,
+           coalesce(s.points[1:from_week - 1], array_fill(0, array[from_week - 1]))
+               || array_agg(r.points order by r.week),
+           coalesce(s.totals[1:from_week - 1], array_fill(0, array[from_week - 1]))
+               || array_agg(r.total order by r.week),
+           coalesce(s.ranks[1:from_week - 1], array_fill(null::int, array[from_week - 1]))
+               || array_agg(r.rank order by r.week)
+      from ranked r
+      left join user_week_series s on s.user_id = r.user_id
+     group by r.user_id, s.points, s.totals, s.ranks
+    on conflict (user_id) do update
+       set points = excluded.points,
+           totals = excluded.totals,
+           ranks = excluded.ranks,
+           updated_at = now();
+end;
+$$;
+
+-- Standings as of the end of each final week: a week is frozen once
+-- every bet up to and including it is resolved, and its rows are never
+-- rewritten. Usernames are copied so old standings survive deletions.
+create table if not exists week_leaderboards (
+    week int not null,
+    user_id bigint not null,
+    username text not null,
+    rank int not null,
+    total_points int not null,
+    week_points int not null,
+    frozen_at timestamptz not null default now(),
+    primary key (week, user_id)
+);
+
+create index if not exists week_leaderboards_rank_idx
+    on week_leaderboards (week, rank);
+
+create or replace function freeze_week_leaderboards()
+returns void
+language sql
+as $$
+    insert into week_leaderboards (week, user_id, username, rank, total_points, week_points)
+    select w.week, s.user_id, u.username, s.ranks[w.week], s.totals[w.week], s.points[w.week]
+      from (select distinct week
+              from bets
+             where week > (select coalesce(max(week), 0) from week_leaderboards)
+               and week < coalesce((select min(week) from bets where status <> 'resolved'), 2147483647)) w
+      join user_week_series s on cardinality(s.ranks) >= w.week
+      join users u on u.id = s.user_id
+     where s.ranks[w.week] is not null
+    on conflict (week, user_id) do nothing;
+$$;
+
+-- Bet resolution runs as a durable job per bet: the scores snapshot is
+-- stored when it starts and every user's delta is a resolution_credits
+-- row that is marked applied in the same transaction that writes its
+-- ledger entry.
+-- A failed run is resumed by calling apply_resolution_jobs again; no
+-- delta is ever credited twice.
+drop function if exists apply_bet_resolution(bigint, text, jsonb, jsonb);
+drop function if exists apply_bet_resolutions(jsonb, jsonb, jsonb);
+
+create table if not exists resolution_jobs (
+    bet_id bigint primary key references bets (id) on delete cascade,
+    correct_answer text not null,
+    scores jsonb not null,
+    status text not null default 'pending',
+    credits_total int not null default 0,
+    credits_applied int not null default 0,
+    created_at timestamptz not null default now(),
+    completed_at timestamptz
+);
+
+create table if not exists resolution_credits (
+    bet_id bigint not null references resolution_jobs (bet_id) on delete cascade,
+    user_id bigint not null references users (id) on delete cascade,
+    delta int not null,
+    applied boolean not null default false,
+    primary key (bet_id, user_id)
+);
+
+create index if not exists resolution_credits_pending_idx
+    on resolution_credits (bet_id) where not applied;
+
+-- Start a job per bet. p_jobs maps bet id -> {"correct_answer": text,
+-- "scores": {prediction id: points}, "deltas": {user id: delta}}.
+-- Bets that already have a job keep it.
+create or replace function create_resolution_jobs(p_jobs jsonb)
+returns void
+language sql
+as $$
+    with created as (
+        insert into resolution_jobs (bet_id, correct_answer, scores, credits_total)
+        select j.key::bigint,
+               j.value->>'correct_answer',
+               j.value->'scores',
+               (select count(*) from jsonb_object_keys(j.value->'deltas'))
+          from jsonb_each(p_jobs) j
+        on conflict (bet_id) do nothing
+        returning bet_id
+    )
+    insert into resolution_credits (bet_id, user_id, delta)
+    select c.bet_id, d.key::bigint, d.value::int
+      from created c
+     cross join lateral jsonb_each_text(p_jobs->(c.bet_id::text)->'deltas') d;
+$$;
+
+-- Credit up to p_batch_size pending deltas of the given jobs. When none
+-- are left, write the snapshots' prediction points, bump user_stats and
+-- flip the bets to resolved. Returns the jobs' combined progress.
+create or replace function apply_resolution_jobs(p_bet_ids bigint[], p_batch_size int)
+returns table (credits_applied bigint, credits_total bigint, done boolean)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    credited_now int;
+begin
+    -- Concurrent runs of the same jobs take turns
+    perform 1 from resolution_jobs where bet_id = any(p_bet_ids) order by bet_id for update;
+
+    with picked as (
+        update resolution_credits c
+           set applied = true
+          from (select bet_id, user_id
+                  from resolution_credits
+                 where bet_id = any(p_bet_ids) and not applied
+                 order by bet_id, user_id
+                 limit p_batch_size) s
+         where c.bet_id = s.bet_id and c.user_id = s.user_id
+        returning c.bet_id, c.user_id, c.delta
+    ), counted as (
+        update resolution_jobs j
+           set credits_applied = j.credits_applied + n.applied
+          from (select bet_id, count(*) as applied from picked group by bet_id) n
+         where j.bet_id = n.bet_id
+    ), credited as (
+        insert into reedz_ledger (user_id, delta, source, bet_id)
+        select user_id, delta, 'bet_resolution', bet_id from picked
+    )
+    select count(*) into credited_now from picked;
+
+    if not exists (select 1 from resolution_credits
+                    where bet_id = any(p_bet_ids) and not applied) then
+        update predictions p
+           set points_earned = s.value::int
+          from resolution_jobs j
+         cross join lateral jsonb_each_text(j.scores) s
+         where j.bet_id = any(p_bet_ids) and j.status = 'pending'
+           and p.id = s.key::bigint and p.bet_id = j.bet_id;
+
+        insert into user_stats (user_id, exact_answers, total_points, bets_resolved)
+        select p.user_id,
+               count(*) filter (where s.value::int >= 26),
+               sum(s.value::int),
+               count(*)
+          from resolution_jobs j
+         cross join lateral jsonb_each_text(j.scores) s
+          join predictions p on p.id = s.key::bigint and p.bet_id = j.bet_id
+         where j.bet_id = any(p_bet_ids) and j.status = 'pending'
+         group by p.user_id
+        on conflict (user_id) do update
+           set exact_answers = user_stats.exact_answers + excluded.exact_answers,
+               total_points = user_stats.total_points + excluded.total_points,
+               bets_resolved = user_stats.bets_resolved + excluded.bets_resolved;
+
+        update bets b
+           set status = 'resolved',
+               correct_answer = j.correct_answer,
+               resolved_at = now()
+          from resolution_jobs j
+         where j.bet_id = b.id
+           and j.bet_id = any(p_bet_ids) and j.status = 'pending';
+
+        perform refresh_week_series((
+            select min(b.week) from bets b
+              join resolution_jobs j on j.bet_id = b.id
+             where j.bet_id = any(p_bet_ids) and j.status = 'pending'));
+        perform freeze_week_leaderboards();
+
+        update resolution_jobs
+           set status = 'done', completed_at = now()
+         where bet_id = any(p_bet_ids) and status = 'pending';
+    end if;
+
+    return query
+    select coalesce(sum(j.credits_applied), 0)::bigint,
+           coalesce(sum(j.credits_total), 0)::bigint,
+           coalesce(bool_and(j.status = 'done'), false)
+      from resolution_jobs j
+     where j.bet_id = any(p_bet_ids);
+end;
+$$;
+
+-- Keyset paging (iter_predictions_by_user / _by_bet) walks a user's or a
+-- bet's predictions in id order, one page per request.
+create index if not exists predictions_user_id_idx on predictions (user_id, id);
+create index if not exists predictions_bet_id_idx on predictions (bet_id, id);
+
+-- BetQuery filters (find_bets): status + week for the week selectors,
+-- week alone for week ranges, creator for per-commissioner lists.
+create index if not exists bets_status_created_idx on bets (status, created_at desc);
+create index if not exists bets_status_week_idx on bets (status, week);
+create index if not exists bets_week_idx on bets (week, created_at desc);
+create index if not exists bets_creator_created_idx on bets (creator_id, created_at desc);
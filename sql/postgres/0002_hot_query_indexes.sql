@@ -0,0 +1,31 @@
+-- Indexes behind every hot read, so none of them scans a table:
+--   predictions eq(user_id) / eq(user_id).eq(bet_id)  -> (user_id, bet_id), unique
+--   predictions eq(bet_id)                            -> predictions_bet_id_idx (baseline)
+--   bets eq(status).order(created_at)                 -> bets_status_created_idx (baseline)
+--   users eq(username)                                -> users_username_key (baseline)
+--   active users, balance order                       -> (is_active, id) plus the ledger
+--                                                        and snapshot keys user_accounts sums
+-- The unique index fails if a user already has two predictions on a bet;
+-- delete the duplicates first.
+create unique index if not exists predictions_user_bet_key on predictions (user_id, bet_id);
+create index if not exists users_active_idx on users (is_active, id);
+
+-- Every index on the public tables with its key columns in order, read by
+-- the startup schema check (PostgREST doesn't expose pg_catalog).
+create or replace function index_columns()
+returns table (table_name text, index_name text, columns text[], is_unique boolean)
+language sql
+stable
+as $$
+    select t.relname::text, i.relname::text,
+           array(select a.attname::text
+                   from unnest(x.indkey::int2[]) with ordinality k (attnum, n)
+                   join pg_attribute a on a.attrelid = x.indrelid and a.attnum = k.attnum
+                  order by k.n),
+           x.indisunique
+      from pg_index x
+      join pg_class i on i.oid = x.indexrelid
+      join pg_class t on t.oid = x.indrelid
+      join pg_namespace ns on ns.oid = t.relnamespace
+     where ns.nspname = 'public';
+$$;
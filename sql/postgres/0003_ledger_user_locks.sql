@@ -0,0 +1,195 @@
+-- Ledger writers and balance snapshots coordinate per user instead of
+-- locking reedz_ledger. Every function that appends entries first takes a
+-- shared transaction-level advisory lock on each user it credits; a
+-- snapshot takes the same locks exclusively, for only the users it folds.
+-- Writers never wait on each other, and a snapshot waits out just the
+-- in-flight entries of its own users, so no entry below a snapshot's
+-- ledger_id can commit after it. Locks are taken in user id order.
+create or replace function lock_ledger_users(p_user_ids bigint[], p_exclusive boolean default false)
+returns void
+language plpgsql
+as $$
+declare
+    uid bigint;
+begin
+    for uid in select distinct u from unnest(p_user_ids) u order by u loop
+        if p_exclusive then
+            perform pg_advisory_xact_lock(hashtext('reedz_ledger'), uid::int);
+        else
+            perform pg_advisory_xact_lock_shared(hashtext('reedz_ledger'), uid::int);
+        end if;
+    end loop;
+end;
+$$;
+
+create or replace function increment_reedz(
+    p_deltas jsonb,
+    p_source text default 'admin_adjustment',
+    p_bet_id bigint default null
+) returns table (id bigint, reedz_balance bigint)
+language sql
+as $$
+    select lock_ledger_users(array(select k::bigint from jsonb_object_keys(p_deltas) k));
+
+    insert into reedz_ledger (user_id, delta, source, bet_id)
+    select u.id, d.value::int, p_source, p_bet_id
+      from jsonb_each_text(p_deltas) d
+      join users u on u.id = d.key::bigint
+     where d.value::int <> 0;
+
+    select a.id::bigint, a.reedz_balance::bigint
+      from user_accounts a
+     where a.id in (select k::bigint from jsonb_object_keys(p_deltas) k);
+$$;
+
+-- Fold ledger tails into new snapshots: of the users the given bets'
+-- resolutions credited, or of every user when p_bet_ids is null.
+-- Returns how many were taken.
+drop function if exists snapshot_reedz();
+
+create or replace function snapshot_reedz(p_bet_ids bigint[] default null)
+returns int
+language plpgsql
+as $$
+declare
+    folded bigint[];
+    taken int;
+begin
+    select array_agg(a.id) into folded
+      from users a
+     where (p_bet_ids is null or a.id in (select c.user_id from resolution_credits c
+                                           where c.bet_id = any(p_bet_ids)))
+       and (select max(l.id) from reedz_ledger l where l.user_id = a.id)
+         > coalesce((select max(s.ledger_id) from reedz_snapshots s where s.user_id = a.id), 0);
+    if folded is null then
+        return 0;
+    end if;
+    perform lock_ledger_users(folded, true);
+
+    insert into reedz_snapshots (user_id, ledger_id, balance)
+    select a.id,
+           (select max(l.id) from reedz_ledger l where l.user_id = a.id),
+           a.reedz_balance
+      from user_accounts a
+     where a.id = any(folded)
+       and (select max(l.id) from reedz_ledger l where l.user_id = a.id)
+         > coalesce((select max(s.ledger_id) from reedz_snapshots s where s.user_id = a.id), 0);
+    get diagnostics taken = row_count;
+    return taken;
+end;
+$$;
+
+-- Zero every active balance with season_reset entries, then snapshot.
+-- Every user is locked up front, since the snapshot folds them all.
+create or replace function reset_reedz_season()
+returns int
+language plpgsql
+as $$
+declare
+    reset int;
+begin
+    perform lock_ledger_users(array(select id from users), true);
+    insert into reedz_ledger (user_id, delta, source)
+    select id, -reedz_balance, 'season_reset'
+      from user_accounts
+     where is_active and reedz_balance <> 0;
+    get diagnostics reset = row_count;
+    perform snapshot_reedz();
+    return reset;
+end;
+$$;
+
+-- As in the baseline, now locking the batch's users before crediting them.
+-- Credit up to p_batch_size pending deltas of the given jobs. When none
+-- are left, write the snapshots' prediction points, bump user_stats and
+-- flip the bets to resolved. Returns the jobs' combined progress.
+create or replace function apply_resolution_jobs(p_bet_ids bigint[], p_batch_size int)
+returns table (credits_applied bigint, credits_total bigint, done boolean)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    credited_now int;
+begin
+    -- Concurrent runs of the same jobs take turns
+    perform 1 from resolution_jobs where bet_id = any(p_bet_ids) order by bet_id for update;
+
+    -- The users this batch credits; the job locks above keep it the batch picked below
+    perform lock_ledger_users(array(
+        select user_id from resolution_credits
+         where bet_id = any(p_bet_ids) and not applied
+         order by bet_id, user_id
+         limit p_batch_size));
+
+    with picked as (
+        update resolution_credits c
+           set applied = true
+          from (select bet_id, user_id
+                  from resolution_credits
+                 where bet_id = any(p_bet_ids) and not applied
+                 order by bet_id, user_id
+                 limit p_batch_size) s
+         where c.bet_id = s.bet_id and c.user_id = s.user_id
+        returning c.bet_id, c.user_id, c.delta
+    ), counted as (
+        update resolution_jobs j
+           set credits_applied = j.credits_applied + n.applied
+          from (select bet_id, count(*) as applied from picked group by bet_id) n
+         where j.bet_id = n.bet_id
+    ), credited as (
+        insert into reedz_ledger (user_id, delta, source, bet_id)
+        select user_id, delta, 'bet_resolution', bet_id from picked
+    )
+    select count(*) into credited_now from picked;
+
+    if not exists (select 1 from resolution_credits
+                    where bet_id = any(p_bet_ids) and not applied) then
+        update predictions p
+           set points_earned = s.value::int
+          from resolution_jobs j
+         cross join lateral jsonb_each_text(j.scores) s
+         where j.bet_id = any(p_bet_ids) and j.status = 'pending'
+           and p.id = s.key::bigint and p.bet_id = j.bet_id;
+
+        insert into user_stats (user_id, exact_answers, total_points, bets_resolved)
+        select p.user_id,
+               count(*) filter (where s.value::int >= 26),
+               sum(s.value::int),
+               count(*)
+          from resolution_jobs j
+         cross join lateral jsonb_each_text(j.scores) s
+          join predictions p on p.id = s.key::bigint and p.bet_id = j.bet_id
+         where j.bet_id = any(p_bet_ids) and j.status = 'pending'
+         group by p.user_id
+        on conflict (user_id) do update
+           set exact_answers = user_stats.exact_answers + excluded.exact_answers,
+               total_points = user_stats.total_points + excluded.total_points,
+               bets_resolved = user_stats.bets_resolved + excluded.bets_resolved;
+
+        update bets b
+           set status = 'resolved',
+               correct_answer = j.correct_answer,
+               resolved_at = now()
+          from resolution_jobs j
+         where j.bet_id = b.id
+           and j.bet_id = any(p_bet_ids) and j.status = 'pending';
+
+        perform refresh_week_series((
+            select min(b.week) from bets b
+              join resolution_jobs j on j.bet_id = b.id
+             where j.bet_id = any(p_bet_ids) and j.status = 'pending'));
+        perform freeze_week_leaderboards();
+
+        update resolution_jobs
+           set status = 'done', completed_at = now()
+         where bet_id = any(p_bet_ids) and status = 'pending';
+    end if;
+
+    return query
+    select coalesce(sum(j.credits_applied), 0)::bigint,
+           coalesce(sum(j.credits_total), 0)::bigint,
+           coalesce(bool_and(j.status = 'done'), false)
+      from resolution_jobs j
+     where j.bet_id = any(p_bet_ids);
+end;
+$$;
@@ -0,0 +1,33 @@
+-- create_resolution_jobs returns the stored job of every bet it was given.
+-- When two admins resolve the same bet at once, on conflict keeps the first
+-- job, and the caller that lost works from that row instead of the scores
+-- it computed. Only bets that are still closed get a job, so an open bet
+-- is never snapshotted while it takes predictions. The select runs as its
+-- own statement so it sees the inserted rows and a concurrent winner's
+-- committed one.
+drop function if exists create_resolution_jobs(jsonb);
+
+create function create_resolution_jobs(p_jobs jsonb)
+returns setof resolution_jobs
+language sql
+as $$
+    with created as (
+        insert into resolution_jobs (bet_id, correct_answer, scores, credits_total)
+        select j.key::bigint,
+               j.value->>'correct_answer',
+               j.value->'scores',
+               (select count(*) from jsonb_object_keys(j.value->'deltas'))
+          from jsonb_each(p_jobs) j
+          join bets b on b.id = j.key::bigint and b.status = 'closed'
+        on conflict (bet_id) do nothing
+        returning bet_id
+    )
+    insert into resolution_credits (bet_id, user_id, delta)
+    select c.bet_id, d.key::bigint, d.value::int
+      from created c
+     cross join lateral jsonb_each_text(p_jobs->(c.bet_id::text)->'deltas') d;
+
+    select *
+      from resolution_jobs
+     where bet_id in (select k::bigint from jsonb_object_keys(p_jobs) k);
+$$;
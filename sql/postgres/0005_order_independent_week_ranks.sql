@@ -0,0 +1,79 @@
+-- Week ranks cover only users with a resolved prediction up to that week.
+-- refresh_week_series used to rank every user already in the series, so a
+-- user's first ranked week depended on the order bets were resolved in.
+-- Stored series are rebuilt from week 1 under the new rule; frozen week
+-- standings are never rewritten.
+create or replace function refresh_week_series(p_from_week int)
+returns void
+language plpgsql
+as $$
+declare
+    from_week int;
+    last_week int;
+begin
+    -- Series are all the same length; never leave a gap after it
+    select least(p_from_week, coalesce(max(cardinality(totals)), 0) + 1)
+      into from_week
+      from user_week_series;
+    select coalesce(max(week), 0) into last_week from bets where status = 'resolved';
+    if last_week < from_week then
+        return;
+    end if;
+
+    with weekly as (
+        select p.user_id, b.week, sum(p.points_earned)::int as points
+          from predictions p
+          join bets b on b.id = p.bet_id
+         where b.status = 'resolved' and b.week >= from_week
+         group by p.user_id, b.week
+    ), members as (
+        select user_id from weekly
+        union
+        select user_id from user_week_series
+    ), grid as (
+        select m.user_id, w.week, coalesce(k.points, 0) as points
+          from members m
+         cross join generate_series(from_week, last_week) w (week)
+          left join weekly k on k.user_id = m.user_id and k.week = w.week
+    ), entered as (
+        -- Ranked from the first week holding one of the user's resolved
+        -- predictions: before from_week if they held a rank then
+        select m.user_id,
+               least(case when s.ranks[from_week - 1] is not null then from_week - 1 end,
+                     (select min(k.week) from weekly k where k.user_id = m.user_id)) as week
+          from members m
+          left join user_week_series s on s.user_id = m.user_id
+    ), running as (
+        select g.user_id, g.week, g.points,
+               (coalesce(s.totals[from_week - 1], 0)
+                + sum(g.points) over (partition by g.user_id order by g.week))::int as total
+          from grid g
+          left join user_week_series s on s.user_id = g.user_id
+    ), ranked as (
+        select r.user_id, r.week, r.points, r.total,
+               case when e.week <= r.week
+                    then (rank() over (partition by r.week, e.week <= r.week order by r.total desc))::int
+               end as rank
+          from running r
+          join entered e on e.user_id = r.user_id
+    )
+    insert into user_week_series (user_id, points, totals, ranks)
+    select r.user_id,
+           coalesce(s.points[1:from_week - 1], array_fill(0, array[from_week - 1]))
+               || array_agg(r.points order by r.week),
+           coalesce(s.totals[1:from_week - 1], array_fill(0, array[from_week - 1]))
+               || array_agg(r.total order by r.week),
+           coalesce(s.ranks[1:from_week - 1], array_fill(null::int, array[from_week - 1]))
+               || array_agg(r.rank order by r.week)
+      from ranked r
+      left join user_week_series s on s.user_id = r.user_id
+     group by r.user_id, s.points, s.totals, s.ranks
+    on conflict (user_id) do update
+       set points = excluded.points,
+           totals = excluded.totals,
+           ranks = excluded.ranks,
+           updated_at = now();
+end;
+$$;
+
+select refresh_week_series(1);
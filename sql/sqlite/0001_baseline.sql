@@ -0,0 +1,126 @@
+-- Baseline: the local schema as of the first versioned release. Every
+-- statement is idempotent, so databases created before migrations were
+-- tracked are adopted as version 1.
+
+create table if not exists users (
+    id integer primary key autoincrement,
+    username text not null unique,
+    password_hash text not null,
+    role text not null default 'member',
+    is_active integer not null default 1
+);
+
+create table if not exists reedz_ledger (
+    id integer primary key autoincrement,
+    user_id integer not null references users (id) on delete cascade,
+    delta integer not null,
+    source text not null,
+    bet_id integer references bets (id) on delete set null,
+    created_at text not null
+);
+create index if not exists reedz_ledger_user_idx on reedz_ledger (user_id, id);
+
+create table if not exists reedz_snapshots (
+    user_id integer not null references users (id) on delete cascade,
+    ledger_id integer not null,
+    balance integer not null,
+    created_at text not null,
+    primary key (user_id, ledger_id)
+);
+
+create view if not exists user_accounts as
+select u.id, u.username, u.password_hash, u.role, u.is_active,
+       coalesce(s.balance, 0) + coalesce((
+           select sum(l.delta) from reedz_ledger l
+            where l.user_id = u.id and l.id > coalesce(s.ledger_id, 0)), 0) as reedz_balance
+  from users u
+  left join reedz_snapshots s on s.user_id = u.id
+   and s.ledger_id = (select max(ledger_id) from reedz_snapshots where user_id = u.id);
+
+create table if not exists bets (
+    id integer primary key autoincrement,
+    week integer not null,
+    title text not null,
+    description text,
+    answertype text not null default 'unknown',
+    status text not null default 'open',
+    correct_answer text,
+    created_at text not null,
+    closed_at text,
+    resolved_at text,
+    creator_id integer references users (id) on delete set null
+);
+create index if not exists bets_status_created_idx on bets (status, created_at desc);
+create index if not exists bets_status_week_idx on bets (status, week);
+create index if not exists bets_week_idx on bets (week, created_at desc);
+create index if not exists bets_creator_created_idx on bets (creator_id, created_at desc);
+
+create table if not exists predictions (
+    id integer primary key autoincrement,
+    bet_id integer not null references bets (id) on delete cascade,
+    user_id integer not null references users (id) on delete cascade,
+    answer text not null,
+    points_earned integer not null default 0,
+    created_at text not null,
+    unique (user_id, bet_id)
+);
+create index if not exists predictions_bet_idx on predictions (bet_id);
+create index if not exists predictions_user_idx on predictions (user_id, id);
+
+create table if not exists user_stats (
+    user_id integer primary key references users (id) on delete cascade,
+    total_predictions integer not null default 0,
+    exact_answers integer not null default 0,
+    total_points integer not null default 0,
+    bets_resolved integer not null default 0
+);
+
+create table if not exists user_week_series (
+    user_id integer primary key references users (id) on delete cascade,
+    points text not null,
+    totals text not null,
+    ranks text not null
+);
+
+create table if not exists week_leaderboards (
+    week integer not null,
+    user_id integer not null,
+    username text not null,
+    rank integer not null,
+    total_points integer not null,
+    week_points integer not null,
+    frozen_at text not null,
+    primary key (week, user_id)
+);
+create index if not exists week_leaderboards_rank_idx on week_leaderboards (week, rank);
+
+create table if not exists resolution_jobs (
+    bet_id integer primary key references bets (id) on delete cascade,
+    correct_answer text not null,
+    scores text not null,
+    status text not null default 'pending',
+    credits_total integer not null default 0,
+    credits_applied integer not null default 0,
+    created_at text not null,
+    completed_at text
+);
+
+create table if not exists resolution_credits (
+    bet_id integer not null references resolution_jobs (bet_id) on delete cascade,
+    user_id integer not null references users (id) on delete cascade,
+    delta integer not null,
+    applied integer not null default 0,
+    primary key (bet_id, user_id)
+);
+create index if not exists resolution_credits_pending_idx on resolution_credits (bet_id) where applied = 0;
+
+create trigger if not exists predictions_count_insert after insert on predictions
+begin
+    insert into user_stats (user_id, total_predictions) values (new.user_id, 1)
+    on conflict (user_id) do update set total_predictions = total_predictions + 1;
+end;
+
+create trigger if not exists predictions_count_delete after delete on predictions
+begin
+    update user_stats set total_predictions = total_predictions - 1 where user_id = old.user_id;
+end;
@@ -0,0 +1,4 @@
+-- Active-user lists; the other hot reads are covered by the baseline
+-- (predictions unique (user_id, bet_id), predictions_bet_idx,
+-- bets_status_created_idx, users.username unique).
+create index if not exists users_active_idx on users (is_active, id);
@@ -0,0 +1,6 @@
+-- Week ranks now cover only users with a resolved prediction up to that
+-- week, whatever order the bets were resolved in. Series written under the
+-- old rule ranked users by when they first appeared, so they are dropped
+-- and rebuilt from week 1 by the next resolution. Frozen week standings
+-- are never rewritten.
+delete from user_week_series;
@@ -0,0 +1,564 @@
+"""
+Local SQLite storage backend, for running and testing without Supabase
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import User, PublicUser, LeaderboardRow, Bet, Prediction, LedgerEntry, ResolutionJob, WeekSeries, UserRole, BetStatus, JobStatus, LedgerSource
+from query_cache import QueryCache, cached, invalidates
+from identity_map import identity_lookup, identity_register
+from migrations import migrate_sqlite
+from tracing import traced, count_round_trip
+from database import Database, BetQuery, USER_TTL, BET_TTL, FROZEN_TTL, PUBLIC_USER_COLUMNS, BET_LIST_COLUMNS, public_user_from_row, leaderboard_row, user_tags, bet_prediction_tags, user_from_row, bet_from_row, bets_from_rows, prediction_from_row, predictions_from_rows, ledger_from_row, series_from_row, job_from_row
+
+# SQL for BetQuery.conditions() operators other than "in"
+_OPERATORS = {"eq": "=", "gte": ">=", "lte": "<=", "lt": "<"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def _placeholders(values: List) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _json_rows(rows: Iterable[tuple]) -> str:
+    """
+    Rows as a JSON array of arrays; bulk writes expand it with json_each, so
+    they are one statement however many rows they touch
+    """
+    return json.dumps([list(row) for row in rows])
+
+
+class _Connection(sqlite3.Connection):
+    """
+    Counts every call that sends SQL to SQLite as one round trip, like one
+    request to Supabase; the trigger programs and implicit BEGIN / COMMIT
+    it sets off ride along with it
+    """
+
+    def _sent(self):
+        count_round_trip()
+
+    def execute(self, *args):
+        self._sent()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        self._sent()
+        return super().executemany(*args)
+
+    def executescript(self, *args):
+        self._sent()
+        return super().executescript(*args)
+
+
+@traced
+class SqliteDatabase(Database):
+    """Local database in a single SQLite file (or ":memory:")"""
+
+    dialect = "sqlite"
+    connection_class = _Connection
+
+    def __init__(self, path: str = "reedz.db", cache: Optional[QueryCache] = None):
+        super().__init__(cache)
+        self.path = path
+        # One shared connection; Streamlit sessions run on separate threads
+        self._conn = sqlite3.connect(path, check_same_thread=False, factory=self.connection_class)
+        self._conn.row_factory = _dict_factory
+        self._conn.execute("pragma foreign_keys = on")
+        self._lock = threading.RLock()
+        with self._lock:
+            migrate_sqlite(self._conn)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[dict]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_schema_version(self) -> Optional[int]:
+        return self._query("select coalesce(max(version), 0) as version from schema_migrations")[0]["version"]
+
+    def get_index_columns(self) -> Optional[List[dict]]:
+        indexes = []
+        for table in self._query("select name from sqlite_master where type = 'table' and name not like 'sqlite_%'"):
+            for index in self._query(f"pragma index_list('{table['name']}')"):
+                columns = [col["name"] for col in self._query(f"pragma index_info('{index['name']}')")]
+                indexes.append({'table_name': table["name"], 'index_name': index["name"],
+                                'columns': columns, 'is_unique': bool(index["unique"])})
+        return indexes
+
+    def _fetch_page(self, table: str, columns: str, filters: Dict[str, object], after_id: Optional[int],
+                    page_size: int, descending: bool) -> List[dict]:
+        where = [f"{column} = ?" for column in filters]
+        params = list(filters.values())
+        if after_id is not None:
+            where.append("id < ?" if descending else "id > ?")
+            params.append(after_id)
+        sql = f"select {columns} from {table}"
+        if where:
+            sql += " where " + " and ".join(where)
+        sql += f" order by id {'desc' if descending else 'asc'} limit ?"
+        return self._query(sql, (*params, page_size))
+
+    # ==================== USER OPERATIONS ====================
+
+    @invalidates("users", "leaderboard")
+    def create_user(self, username: str, password_hash: str, role: UserRole) -> Tuple[bool, str, Optional[int]]:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "insert into users (username, password_hash, role, is_active) values (?, ?, ?, 1)",
+                    (username, password_hash, role.value))
+            return True, "User created successfully", cur.lastrowid
+        except sqlite3.IntegrityError:
+            return False, "Username already exists", None
+        except Exception as e:
+            return False, f"Error: {str(e)}", None
+
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        rows = self._query("select * from user_accounts where username = ? and is_active = 1", (username,))
+        return user_from_row(rows[0]) if rows else None
+
+    @identity_lookup(PublicUser)
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_user_by_id(self, user_id: int) -> Optional[PublicUser]:
+        rows = self._query(f"select {PUBLIC_USER_COLUMNS} from user_accounts where id = ? and is_active = 1", (user_id,))
+        return public_user_from_row(rows[0]) if rows else None
+
+    @identity_register
+    @cached(USER_TTL, "users")
+    def get_all_users(self) -> List[PublicUser]:
+        rows = self._query(f"select {PUBLIC_USER_COLUMNS} from user_accounts where is_active = 1 order by reedz_balance desc")
+        return [public_user_from_row(row) for row in rows]
+
+    @cached(USER_TTL, "leaderboard")
+    def get_leaderboard(self, limit: int = 10) -> List[LeaderboardRow]:
+        rows = self._query(
+            "select u.id, u.username, u.reedz_balance, "
+            "coalesce(s.total_predictions, 0) as total_predictions, coalesce(s.exact_answers, 0) as exact_answers, "
+            "coalesce(s.total_points, 0) as total_points, coalesce(s.bets_resolved, 0) as bets_resolved "
+            "from user_accounts u left join user_stats s on s.user_id = u.id "
+            "where u.is_active = 1 order by u.reedz_balance desc limit ?", (limit,))
+        return [leaderboard_row(rank, row, row) for rank, row in enumerate(rows, 1)]
+
+    @cached(FROZEN_TTL, "leaderboard")
+    def get_frozen_weeks(self) -> List[int]:
+        return [row["week"] for row in self._query("select distinct week from week_leaderboards order by week")]
+
+    @cached(FROZEN_TTL, "leaderboard")
+    def get_week_leaderboard(self, week: int, limit: Optional[int] = None) -> List[dict]:
+        rows = self._query("select * from week_leaderboards where week = ? order by rank, username limit ?",
+                           (week, limit if limit else -1))
+        return [{
+            'rank': row["rank"],
+            'user_id': row["user_id"],
+            'username': row["username"],
+            'total_points': row["total_points"],
+            'week_points': row["week_points"]
+        } for row in rows]
+
+    @invalidates("users", "leaderboard", "user:{user_id}", "predictions")
+    def deactivate_user(self, user_id: int) -> Tuple[bool, str]:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("delete from predictions where user_id = ?", (user_id,))
+                self._conn.execute("delete from users where id = ?", (user_id,))
+            return True, "User and all associated data deleted"
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+
+    # ==================== BET OPERATIONS ====================
+
+    @invalidates("bets")
+    def create_bet(self, week: int, title: str, description: str, answertype: str, creator_id: int) -> Tuple[bool, str, Optional[int]]:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "insert into bets (week, title, description, answertype, status, created_at, creator_id) values (?, ?, ?, ?, ?, ?, ?)",
+                    (week, title, description, answertype, BetStatus.OPEN.value, _now(), creator_id))
+            return True, "Bet created successfully", cur.lastrowid
+        except Exception as e:
+            return False, f"Error: {str(e)}", None
+
+    @identity_lookup(Bet)
+    @cached(BET_TTL, "bets")
+    def get_bet_by_id(self, bet_id: int) -> Optional[Bet]:
+        rows = self._query("select * from bets where id = ?", (bet_id,))
+        return bet_from_row(rows[0]) if rows else None
+
+    @identity_register
+    @cached(BET_TTL, "bets")
+    def get_bets_by_status(self, status: BetStatus) -> List[Bet]:
+        return bets_from_rows(self._query("select * from bets where status = ? order by created_at desc", (status.value,)))
+
+    @identity_register
+    @cached(BET_TTL, "bets")
+    def get_all_bets(self) -> List[Bet]:
+        return bets_from_rows(self._query("select * from bets order by created_at desc"))
+
+    def _bet_rows(self, query: BetQuery) -> List[dict]:
+        where, params = [], []
+        for column, op, value in query.conditions():
+            if op == "in":
+                where.append(f"{column} in ({_placeholders(value)})")
+                params.extend(value)
+            else:
+                where.append(f"{column} {_OPERATORS[op]} ?")
+                params.append(value)
+        sql = f"select {BET_LIST_COLUMNS if query.summary else '*'} from bets"
+        if where:
+            sql += " where " + " and ".join(where)
+        sql += " order by created_at desc, id desc limit ?"
+        return self._query(sql, (*params, query.limit if query.limit else -1))
+
+    @invalidates("bets")
+    def close_bet(self, bet_id: int) -> Tuple[bool, str]:
+        with self._lock, self._conn:
+            cur = self._conn.execute("update bets set status = ?, closed_at = ? where id = ?",
+                                     (BetStatus.CLOSED.value, _now(), bet_id))
+        if cur.rowcount:
+            return True, "Bet closed"
+        return False, "Failed to close bet"
+
+    @invalidates("bets")
+    def resolve_bet(self, bet_id: int, correct_answer: str) -> Tuple[bool, str]:
+        with self._lock, self._conn:
+            cur = self._conn.execute("update bets set correct_answer = ?, status = ?, resolved_at = ? where id = ?",
+                                     (correct_answer, BetStatus.RESOLVED.value, _now(), bet_id))
+        if cur.rowcount:
+            return True, "Bet resolved successfully"
+        return False, "Failed to resolve bet"
+
+    # ==================== RESOLUTION JOBS ====================
+
+    def get_resolution_jobs(self, bet_ids: List[int]) -> Dict[int, ResolutionJob]:
+        if not bet_ids:
+            return {}
+        bet_ids = list(bet_ids)
+        rows = self._query(f"select * from resolution_jobs where bet_id in ({_placeholders(bet_ids)})", tuple(bet_ids))
+        return {row["bet_id"]: job_from_row(row) for row in rows}
+
+    def create_resolution_jobs(self, jobs: Dict[int, Tuple[str, Dict[int, int], Dict[int, int]]]) -> Tuple[bool, str, Dict[int, ResolutionJob]]:
+        bet_ids = list(jobs)
+        try:
+            with self._lock, self._conn:
+                created = [row["bet_id"] for row in self._conn.execute(
+                    "insert into resolution_jobs (bet_id, correct_answer, scores, status, credits_total, created_at) "
+                    "select cast(j.key as integer), json_extract(j.value, '$[0]'), json_extract(j.value, '$[1]'), ?, "
+                    "json_extract(j.value, '$[2]'), ? from json_each(?) j join bets b on b.id = cast(j.key as integer) "
+                    "where b.status = ? on conflict (bet_id) do nothing returning bet_id",
+                    (JobStatus.PENDING.value, _now(), json.dumps({
+                        bet_id: [correct_answer, scores, len(deltas)]
+                        for bet_id, (correct_answer, scores, deltas) in jobs.items()}),
+                     BetStatus.CLOSED.value)).fetchall()]
+                if created:
+                    self._conn.execute(
+                        "insert into resolution_credits (bet_id, user_id, delta) "
+                        "select cast(j.key as integer), cast(d.key as integer), d.value from json_each(?) j, json_each(j.value) d",
+                        (json.dumps({bet_id: jobs[bet_id][2] for bet_id in created}),))
+                rows = self._conn.execute(
+                    f"select * from resolution_jobs where bet_id in ({_placeholders(bet_ids)})", bet_ids).fetchall()
+            return True, "Resolution started", {row["bet_id"]: job_from_row(row) for row in rows}
+        except Exception as e:
+            return False, f"Error: {str(e)}", {}
+
+    @invalidates("bets", "predictions", "users", "leaderboard")
+    def apply_resolution_jobs(self, bet_ids: List[int], batch_size: int) -> Tuple[bool, str, Dict]:
+        try:
+            bet_ids = list(bet_ids)
+            marks = _placeholders(bet_ids)
+            with self._lock, self._conn:
+                batch = self._conn.execute(
+                    f"select bet_id, user_id, delta from resolution_credits where bet_id in ({marks}) and applied = 0 "
+                    "order by bet_id, user_id limit ?", (*bet_ids, batch_size)).fetchall()
+                if batch:
+                    applied: Dict[int, int] = {}
+                    for row in batch:
+                        applied[row["bet_id"]] = applied.get(row["bet_id"], 0) + 1
+                    credits = _json_rows((row["bet_id"], row["user_id"], row["delta"]) for row in batch)
+                    self._conn.execute(
+                        "update resolution_credits set applied = 1 where (bet_id, user_id) in "
+                        "(select json_extract(value, '$[0]'), json_extract(value, '$[1]') from json_each(?))", (credits,))
+                    self._conn.execute(
+                        "update resolution_jobs set credits_applied = credits_applied + n.value "
+                        "from json_each(?) n where resolution_jobs.bet_id = cast(n.key as integer)", (json.dumps(applied),))
+                    self._conn.execute(
+                        "insert into reedz_ledger (user_id, delta, source, bet_id, created_at) "
+                        "select json_extract(value, '$[1]'), json_extract(value, '$[2]'), ?, json_extract(value, '$[0]'), ? "
+                        "from json_each(?)", (LedgerSource.BET_RESOLUTION.value, _now(), credits))
+                pending = self._conn.execute(
+                    f"select 1 from resolution_credits where bet_id in ({marks}) and applied = 0 limit 1", bet_ids).fetchone()
+                if not pending:
+                    self._finish_jobs(bet_ids)
+                progress = self._conn.execute(
+                    "select coalesce(sum(credits_applied), 0) as applied, coalesce(sum(credits_total), 0) as total, "
+                    f"coalesce(min(status = ?), 0) as done from resolution_jobs where bet_id in ({marks})",
+                    (JobStatus.DONE.value, *bet_ids)).fetchone()
+            progress["done"] = bool(progress["done"])
+            return True, "Resolution complete" if progress["done"] else "Resolution in progress", progress
+        except Exception as e:
+            return False, f"Error: {str(e)}", {}
+
+    def _finish_jobs(self, bet_ids: List[int]):
+        """Write the points snapshot of every pending job and resolve its bet, on the current transaction"""
+        finished = [row["bet_id"] for row in self._conn.execute(
+            f"select bet_id from resolution_jobs where bet_id in ({_placeholders(bet_ids)}) and status = ?",
+            (*bet_ids, JobStatus.PENDING.value))]
+        if not finished:
+            return
+        marks = _placeholders(finished)
+        now = _now()
+        self._conn.execute(
+            "update predictions set points_earned = s.value "
+            "from resolution_jobs j, json_each(j.scores) s "
+            f"where j.bet_id in ({marks}) and predictions.id = cast(s.key as integer) and predictions.bet_id = j.bet_id",
+            finished)
+        self._conn.execute(
+            "update bets set status = ?, correct_answer = j.correct_answer, resolved_at = ? "
+            f"from resolution_jobs j where j.bet_id = bets.id and j.bet_id in ({marks})",
+            (BetStatus.RESOLVED.value, now, *finished))
+        self._conn.execute(
+            "insert into user_stats (user_id, exact_answers, total_points, bets_resolved) "
+            "select user_id, sum(points_earned >= 26), sum(points_earned), count(*) "
+            f"from predictions where bet_id in ({_placeholders(finished)}) group by user_id "
+            "on conflict (user_id) do update set "
+            "exact_answers = exact_answers + excluded.exact_answers, "
+            "total_points = total_points + excluded.total_points, "
+            "bets_resolved = bets_resolved + excluded.bets_resolved", finished)
+        first_week = self._conn.execute(f"select min(week) as week from bets where id in ({_placeholders(finished)})",
+                                        finished).fetchone()["week"]
+        self._refresh_week_series(first_week)
+        self._freeze_weeks()
+        self._conn.execute(f"update resolution_jobs set status = ?, completed_at = ? where bet_id in ({_placeholders(finished)})",
+                           (JobStatus.DONE.value, now, *finished))
+
+    def _freeze_weeks(self):
+        """Snapshot the standings of every newly final week: all bets up to it are resolved"""
+        frozen = self._conn.execute("select coalesce(max(week), 0) as week from week_leaderboards").fetchone()["week"]
+        first_open = self._conn.execute("select min(week) as week from bets where status <> ?",
+                                        (BetStatus.RESOLVED.value,)).fetchone()["week"]
+        weeks = [row["week"] for row in self._conn.execute(
+            "select distinct week from bets where week > ? and week < ? order by week",
+            (frozen, first_open if first_open is not None else 1 << 31))]
+        if not weeks:
+            return
+        rows = self._conn.execute(
+            "select s.*, u.username from user_week_series s join users u on u.id = s.user_id").fetchall()
+        series = [(row["username"], series_from_row(row)) for row in rows]
+        now = _now()
+        self._conn.execute(
+            "insert into week_leaderboards (week, user_id, username, rank, total_points, week_points, frozen_at) "
+            "select json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'), "
+            "json_extract(value, '$[3]'), json_extract(value, '$[4]'), json_extract(value, '$[5]'), ? "
+            "from json_each(?) where true on conflict (week, user_id) do nothing",
+            (now, _json_rows((week, s.user_id, username, s.ranks[week - 1], s.totals[week - 1], s.points[week - 1])
+                             for week in weeks for username, s in series
+                             if len(s.ranks) >= week and s.ranks[week - 1] is not None)))
+
+    def _refresh_week_series(self, from_week: int):
+        """Recompute every user's series from from_week on, keeping earlier weeks as stored"""
+        series = {row["user_id"]: series_from_row(row) for row in
+                  self._conn.execute("select * from user_week_series").fetchall()}
+        stored_weeks = max((len(s.totals) for s in series.values()), default=0)
+        from_week = min(from_week, stored_weeks + 1)
+        last_week = self._conn.execute("select max(week) as week from bets where status = ?",
+                                       (BetStatus.RESOLVED.value,)).fetchone()["week"] or 0
+        if last_week < from_week:
+            return
+        weekly: Dict[Tuple[int, int], int] = {}
+        for row in self._conn.execute(
+                "select p.user_id, b.week, sum(p.points_earned) as points "
+                "from predictions p join bets b on b.id = p.bet_id "
+                "where b.status = ? and b.week >= ? group by p.user_id, b.week",
+                (BetStatus.RESOLVED.value, from_week)):
+            weekly[(row["user_id"], row["week"])] = row["points"]
+        kept = from_week - 1
+        for user_id in {user_id for user_id, _ in weekly} - set(series):
+            series[user_id] = WeekSeries(user_id, [0] * kept, [0] * kept, [None] * kept)
+        for s in series.values():
+            total = s.totals[kept - 1] if kept else 0
+            del s.points[kept:], s.totals[kept:], s.ranks[kept:]
+            for week in range(from_week, last_week + 1):
+                points = weekly.get((s.user_id, week), 0)
+                total += points
+                s.points.append(points)
+                s.totals.append(total)
+        # A user is ranked from the first week holding one of their resolved
+        # predictions, so the ranks don't depend on the order bets were resolved in
+        first_ranked = {s.user_id: kept - 1 for s in series.values() if kept and s.ranks[kept - 1] is not None}
+        for user_id, week in sorted(weekly):
+            first_ranked.setdefault(user_id, week - 1)
+        for i in range(kept, last_week):
+            ordered = sorted((s for s in series.values() if first_ranked.get(s.user_id, last_week) <= i),
+                             key=lambda s: s.totals[i], reverse=True)
+            for s in series.values():
+                s.ranks.append(None)
+            for position, s in enumerate(ordered):
+                tied = position and ordered[position - 1].totals[i] == s.totals[i]
+                s.ranks[i] = ordered[position - 1].ranks[i] if tied else position + 1
+        self._conn.execute(
+            "insert into user_week_series (user_id, points, totals, ranks) "
+            "select json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'), "
+            "json_extract(value, '$[3]') from json_each(?) where true "
+            "on conflict (user_id) do update set points = excluded.points, totals = excluded.totals, ranks = excluded.ranks",
+            (_json_rows((s.user_id, s.points, s.totals, s.ranks) for s in series.values()),))
+
+    # ==================== PREDICTION OPERATIONS ====================
+
+    @invalidates("predictions:user:{user_id}", "predictions:bet:{bet_id}", "leaderboard")
+    def create_prediction(self, bet_id: int, user_id: int, answer: str) -> Tuple[bool, str, Optional[int]]:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "insert into predictions (bet_id, user_id, answer, points_earned, created_at) values (?, ?, ?, 0, ?)",
+                    (bet_id, user_id, answer, _now()))
+            return True, "Prediction created", cur.lastrowid
+        except Exception as e:
+            return False, f"Error: {str(e)}", None
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
+    def get_prediction_by_user_bet(self, user_id: int, bet_id: int) -> Optional[Prediction]:
+        rows = self._query("select * from predictions where user_id = ? and bet_id = ?", (user_id, bet_id))
+        return prediction_from_row(rows[0]) if rows else None
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
+    def get_predictions_for_user_bets(self, user_id: int, bet_ids: List[int]) -> Dict[int, Prediction]:
+        if not bet_ids:
+            return {}
+        bet_ids = list(bet_ids)
+        rows = self._query(f"select * from predictions where user_id = ? and bet_id in ({_placeholders(bet_ids)})",
+                           (user_id, *bet_ids))
+        return {row["bet_id"]: prediction_from_row(row) for row in rows}
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:bet:{bet_id}")
+    def get_predictions_by_bet(self, bet_id: int) -> List[Prediction]:
+        return predictions_from_rows(self._query("select * from predictions where bet_id = ?", (bet_id,)))
+
+    @cached(BET_TTL, "predictions", bet_prediction_tags)
+    def get_predictions_for_bets(self, bet_ids: List[int]) -> Dict[int, List[Prediction]]:
+        if not bet_ids:
+            return {}
+        bet_ids = list(bet_ids)
+        grouped = {bet_id: [] for bet_id in bet_ids}
+        for row in self._query(f"select * from predictions where bet_id in ({_placeholders(bet_ids)})", tuple(bet_ids)):
+            grouped[row["bet_id"]].append(prediction_from_row(row))
+        return grouped
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
+    def get_predictions_by_user(self, user_id: int) -> List[Prediction]:
+        return predictions_from_rows(self._query("select * from predictions where user_id = ?", (user_id,)))
+
+    @identity_register
+    @cached(BET_TTL, "bets", "predictions", "predictions:user:{user_id}")
+    def get_user_bet_history(self, user_id: int, limit: Optional[int] = None) -> List[Tuple[Bet, Prediction]]:
+        rows = self._query(
+            "select b.*, p.id as p_id, p.answer as p_answer, p.points_earned as p_points_earned, p.created_at as p_created_at "
+            "from predictions p join bets b on b.id = p.bet_id "
+            "where p.user_id = ? order by b.week desc, b.created_at desc limit ?",
+            (user_id, limit if limit else -1))
+        return [(bet_from_row(row), Prediction(row["p_id"], row["id"], user_id, row["p_answer"], row["p_points_earned"], row["p_created_at"]))
+                for row in rows]
+
+    @cached(BET_TTL, "bets", "predictions", "predictions:bet:{bet_id}")
+    def get_bet_summary(self, bet_id: int) -> Optional[dict]:
+        bet_rows = self._query("select * from bets where id = ?", (bet_id,))
+        if not bet_rows:
+            return None
+        rows = self._query(
+            "select p.id, p.user_id, u.username, p.answer, p.points_earned, p.created_at "
+            "from predictions p join users u on u.id = p.user_id "
+            "where p.bet_id = ? order by p.created_at", (bet_id,))
+        return {
+            'bet': bet_from_row(bet_rows[0]),
+            'predictions': [{
+                'id': row["id"],
+                'user_id': row["user_id"],
+                'username': row["username"],
+                'answer': row["answer"],
+                'points_earned': row["points_earned"],
+                'submitted_at': row["created_at"]
+            } for row in rows],
+            'total_predictions': len(rows)
+        }
+
+    @invalidates("predictions", "leaderboard")
+    def update_prediction_points(self, prediction_id: int, points: int) -> Tuple[bool, str]:
+        with self._lock, self._conn:
+            cur = self._conn.execute("update predictions set points_earned = ? where id = ?", (points, prediction_id))
+        if cur.rowcount:
+            return True, "Points updated"
+        return False, "Failed to update points"
+
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_week_series(self, user_id: int) -> Optional[WeekSeries]:
+        rows = self._query("select * from user_week_series where user_id = ?", (user_id,))
+        return series_from_row(rows[0]) if rows else None
+
+    # ==================== REEDZ LEDGER ====================
+
+    @invalidates("users", "leaderboard", user_tags)
+    def increment_reedz(self, deltas: Dict[int, int], source: LedgerSource = LedgerSource.ADMIN_ADJUSTMENT,
+                        bet_id: Optional[int] = None) -> Tuple[bool, str, Dict[int, int]]:
+        if not deltas:
+            return True, "Nothing to update", {}
+        try:
+            user_ids = list(deltas)
+            with self._lock, self._conn:
+                now = _now()
+                self._conn.execute(
+                    "insert into reedz_ledger (user_id, delta, source, bet_id, created_at) "
+                    "select u.id, d.value, ?, ?, ? from json_each(?) d join users u on u.id = cast(d.key as integer) "
+                    "where d.value <> 0", (source.value, bet_id, now, json.dumps(deltas)))
+                rows = self._conn.execute(
+                    f"select id, reedz_balance from user_accounts where id in ({_placeholders(user_ids)})", user_ids).fetchall()
+            return True, "Reedz balances updated", {row["id"]: row["reedz_balance"] for row in rows}
+        except Exception as e:
+            return False, f"Error: {str(e)}", {}
+
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_reedz_history(self, user_id: int, limit: Optional[int] = 50) -> List[LedgerEntry]:
+        rows = self._query("select * from reedz_ledger where user_id = ? order by id desc limit ?",
+                           (user_id, limit if limit else -1))
+        return [ledger_from_row(row) for row in rows]
+
+    def snapshot_balances(self, bet_ids: Optional[List[int]] = None) -> Tuple[bool, str]:
+        credited = ""
+        params = [_now()]
+        if bet_ids is not None:
+            credited = f"a.id in (select user_id from resolution_credits where bet_id in ({', '.join('?' * len(bet_ids))})) and "
+            params += bet_ids
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "insert into reedz_snapshots (user_id, ledger_id, balance, created_at) "
+                    "select a.id, (select max(l.id) from reedz_ledger l where l.user_id = a.id), a.reedz_balance, ? "
+                    "from user_accounts a "
+                    f"where {credited}(select max(l.id) from reedz_ledger l where l.user_id = a.id) > "
+                    "coalesce((select max(s.ledger_id) from reedz_snapshots s where s.user_id = a.id), 0)", params)
+            return True, f"Snapshotted {cur.rowcount} balances"
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+
+    @invalidates("users", "leaderboard")
+    def reset_season(self) -> Tuple[bool, str]:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "insert into reedz_ledger (user_id, delta, source, created_at) "
+                    "select id, -reedz_balance, ?, ? from user_accounts where is_active = 1 and reedz_balance <> 0",
+                    (LedgerSource.SEASON_RESET.value, _now()))
+            self.snapshot_balances()
+            return True, f"Reset {cur.rowcount} balances"
+        except Exception as e:
+            return False, f"Error: {str(e)}"
@@ -1,32 +1,85 @@
+import logging
 import os
-from typing import List, Optional, Tuple
-from supabase import create_client, Client
-from models import User, Bet, Prediction, UserRole, BetStatus, AnswerType
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from models import User, PublicUser, LeaderboardRow, Bet, Prediction, LedgerEntry, ResolutionJob, WeekSeries, UserRole, BetStatus, LedgerSource
+from query_cache import QueryCache, cached, invalidates
+from identity_map import identity_lookup, identity_register
+from tracing import traced, count_round_trip, log, log_failure
+from database import Database, BetQuery, USER_TTL, BET_TTL, FROZEN_TTL, POSTGREST_MAX_ROWS, PUBLIC_USER_COLUMNS, BET_LIST_COLUMNS, public_user_from_row, leaderboard_row, user_tags, bet_prediction_tags, user_from_row, bet_from_row, bets_from_rows, prediction_from_row, predictions_from_rows, ledger_from_row, series_from_row, job_from_row
 
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+if TYPE_CHECKING:
+    from supabase import Client
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY environment variables")
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-class SupabaseDatabase:
+def get_client() -> "Client":
+    """Create the Supabase client on first use and share it across the process"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url = os.getenv("SUPABASE_URL", "")
+                key = os.getenv("SUPABASE_KEY", "")
+                if not url or not key:
+                    raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY environment variables")
+                # supabase pulls in the whole HTTP stack, so only import it when a query needs it
+                from supabase import create_client
+                _client = create_client(url, key)
+    return _client
+
+@traced
+class SupabaseDatabase(Database):
     """Cloud database using Supabase PostgreSQL"""
 
-    def __init__(self):
-        """Initialize Supabase connection"""
-        pass
+    dialect = "postgres"
+    max_page_size = POSTGREST_MAX_ROWS
+
+    def __init__(self, cache: Optional[QueryCache] = None):
+        """The client is created on first query; reads go through cache when one is given"""
+        super().__init__(cache)
+
+    @property
+    def client(self) -> "Client":
+        # Every query builds on self.client exactly once, so this counts requests
+        count_round_trip()
+        return get_client()
+
+    def get_schema_version(self) -> Optional[int]:
+        try:
+            response = self.client.table("schema_migrations").select("version").order("version", desc=True).limit(1).execute()
+            return response.data[0]["version"] if response.data else 0
+        except Exception as e:
+            log_failure(e)
+            return None
+
+    def get_index_columns(self) -> Optional[List[dict]]:
+        try:
+            return self.client.rpc("index_columns").execute().data or []
+        except Exception as e:
+            log_failure(e)
+            return None
+
+    def _fetch_page(self, table: str, columns: str, filters: Dict[str, object], after_id: Optional[int],
+                    page_size: int, descending: bool) -> List[dict]:
+        query = self.client.table(table).select(columns)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        if after_id is not None:
+            query = query.lt("id", after_id) if descending else query.gt("id", after_id)
+        return query.order("id", desc=descending).limit(page_size).execute().data or []
 
     # ==================== USER OPERATIONS ====================
 
+    @invalidates("users", "leaderboard")
     def create_user(self, username: str, password_hash: str, role: UserRole) -> Tuple[bool, str, Optional[int]]:
         try:
-            response = supabase.table("users").insert({
+            response = self.client.table("users").insert({
                 "username": username,
                 "password_hash": password_hash,
                 "role": role.value,
-                "reedz_balance": 0,
                 "is_active": True
             }).execute()
             if hasattr(response, 'data') and response.data:
@@ -39,72 +92,96 @@ class SupabaseDatabase:
 
     def get_user_by_username(self, username: str) -> Optional[User]:
         try:
-            response = supabase.table("users").select("*").eq("username", username).eq("is_active", True).execute()
+            response = self.client.table("user_accounts").select("*").eq("username", username).eq("is_active", True).execute()
             if hasattr(response,'data') and response.data:
-                row = response.data[0]
-                return User(
-                    id=row["id"],
-                    username=row["username"],
-                    password_hash=row["password_hash"],
-                    role=UserRole(row["role"]),
-                    reedz_balance=row["reedz_balance"],
-                    is_active=row["is_active"]
-                )
+                return user_from_row(response.data[0])
             return None
         except Exception as e:
-            print(f"Error: {e}")
+            log_failure(e)
             return None
 
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
+    @identity_lookup(PublicUser)
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_user_by_id(self, user_id: int) -> Optional[PublicUser]:
         try:
-            response = supabase.table("users").select("*").eq("id", user_id).eq("is_active", True).execute()
+            response = self.client.table("user_accounts").select(PUBLIC_USER_COLUMNS).eq("id", user_id).eq("is_active", True).execute()
             if hasattr(response, 'data') and response.data:
-                row = response.data[0]
-                return User(
-                    id=row["id"],
-                    username=row["username"],
-                    password_hash=row["password_hash"],
-                    role=UserRole(row["role"]),
-                    reedz_balance=row["reedz_balance"],
-                    is_active=row["is_active"]
-                )
+                return public_user_from_row(response.data[0])
             return None
         except Exception as e:
-            print(f"Error: {e}")
+            log_failure(e)
             return None
 
-    def get_all_users(self) -> List[User]:
+    @identity_register
+    @cached(USER_TTL, "users")
+    def get_all_users(self) -> List[PublicUser]:
         try:
-            response = supabase.table("users").select("*").eq("is_active", True).order("reedz_balance", desc=True).execute()
-            users = []
-            if hasattr(response,'data') and response.data:
-                for row in response.data:
-                    users.append(User(
-                        id=row["id"],
-                        username=row["username"],
-                        password_hash=row["password_hash"],
-                        role=UserRole(row["role"]),
-                        reedz_balance=row["reedz_balance"],
-                        is_active=row["is_active"]
-                    ))
-            return users
-        except Exception as e:
-            print(f"Error: {e}")
+            response = self.client.table("user_accounts").select(PUBLIC_USER_COLUMNS).eq("is_active", True).order("reedz_balance", desc=True).execute()
+            return [public_user_from_row(row) for row in (response.data or [])]
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    @cached(USER_TTL, "leaderboard")
+    def get_leaderboard(self, limit: int = 10) -> List[LeaderboardRow]:
+        """Top active users by balance with their user_stats counters, in one request"""
+        try:
+            response = self.client.table("user_accounts").select("id, username, reedz_balance, user_stats(total_predictions, exact_answers, total_points, bets_resolved)").eq("is_active", True).order("reedz_balance", desc=True).limit(limit).execute()
+            leaderboard = []
+            if hasattr(response, 'data') and response.data:
+                for rank, row in enumerate(response.data, 1):
+                    stats = row.get("user_stats") or {}
+                    if isinstance(stats, list):
+                        stats = stats[0] if stats else {}
+                    leaderboard.append(leaderboard_row(rank, row, stats))
+            return leaderboard
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    @cached(FROZEN_TTL, "leaderboard")
+    def get_frozen_weeks(self) -> List[int]:
+        try:
+            # Rank 1 exists in every frozen week, so this reads one row per week
+            response = self.client.table("week_leaderboards").select("week").eq("rank", 1).order("week").execute()
+            return sorted({row["week"] for row in (response.data or [])})
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    @cached(FROZEN_TTL, "leaderboard")
+    def get_week_leaderboard(self, week: int, limit: Optional[int] = None) -> List[dict]:
+        try:
+            query = self.client.table("week_leaderboards").select("user_id, username, rank, total_points, week_points").eq("week", week).order("rank").order("username")
+            if limit:
+                query = query.limit(limit)
+            response = query.execute()
+            return [{
+                'rank': row["rank"],
+                'user_id': row["user_id"],
+                'username': row["username"],
+                'total_points': row["total_points"],
+                'week_points': row["week_points"]
+            } for row in (response.data or [])]
+        except Exception as e:
+            log_failure(e)
             return []
 
+    @invalidates("users", "leaderboard", "user:{user_id}", "predictions")
     def deactivate_user(self, user_id: int) -> Tuple[bool, str]:
         try:
-            supabase.table("predictions").delete().eq("user_id", user_id).execute()
-            supabase.table("users").delete().eq("id", user_id).execute()
+            self.client.table("predictions").delete().eq("user_id", user_id).execute()
+            self.client.table("users").delete().eq("id", user_id).execute()
             return True, "User and all associated data deleted"
         except Exception as e:
             return False, f"Error: {str(e)}"
 
     # ==================== BET OPERATIONS ====================
 
+    @invalidates("bets")
     def create_bet(self, week: int, title: str, description: str, answertype: str, creator_id: int) -> Tuple[bool, str, Optional[int]]:
         try:
-            response = supabase.table("bets").insert({
+            response = self.client.table("bets").insert({
                 "week": week,
                 "title": title,
                 "description": description,
@@ -122,89 +199,55 @@ class SupabaseDatabase:
         except Exception as e:
             return False, f"Error: {str(e)}", None
 
+    @identity_lookup(Bet)
+    @cached(BET_TTL, "bets")
     def get_bet_by_id(self, bet_id: int) -> Optional[Bet]:
         try:
-            response = supabase.table("bets").select("*").eq("id", bet_id).single().execute()
+            response = self.client.table("bets").select("*").eq("id", bet_id).single().execute()
             if not hasattr(response, 'data') or not response.data:
                 return None
-            row = response.data
-            try:
-                answertype = AnswerType(row["answertype"])
-            except Exception:
-                answertype = AnswerType.UNKNOWN
-            bet_status = BetStatus(row["status"]) if row.get("status") else BetStatus.OPEN
-            return Bet(
-                id=row["id"],
-                week=row["week"],
-                title=row["title"],
-                description=row.get("description"),
-                status=bet_status,
-                answertype=answertype,
-                correct_answer=row.get("correct_answer"),
-                created_at=row.get("created_at"),
-                closed_at=row.get("closed_at"),
-                resolved_at=row.get("resolved_at"),
-                creator_id=row.get("creator_id")
-            )
-        except Exception as e:
-            print(f"Error in get_bet_by_id: {e}")
+            return bet_from_row(response.data)
+        except Exception as e:
+            log_failure(e)
             return None
 
+    @identity_register
+    @cached(BET_TTL, "bets")
     def get_bets_by_status(self, status: BetStatus) -> List[Bet]:
         try:
-            response = supabase.table("bets").select("*").eq("status", status.value).order("created_at", desc=True).execute()
-            bets = []
-            if not hasattr(response, 'data') or not response.data:
-                return []
-            for row in response.data:
-                try:
-                    answertype = AnswerType(row["answertype"])
-                except Exception:
-                    answertype = AnswerType.UNKNOWN
-                bet_status = BetStatus(row["status"]) if row.get("status") else BetStatus.OPEN
-                bets.append(Bet(
-                    id=row["id"],
-                    week=row["week"],
-                    title=row["title"],
-                    description=row.get("description"),
-                    status=bet_status,
-                    answertype=answertype,
-                    correct_answer=row.get("correct_answer"),
-                    created_at=row.get("created_at"),
-                    closed_at=row.get("closed_at"),
-                    resolved_at=row.get("resolved_at"),
-                    creator_id=row.get("creator_id")
-                ))
-            return bets
-        except Exception as e:
-            print("Error fetching bets:", e)
+            response = self.client.table("bets").select("*").eq("status", status.value).order("created_at", desc=True).execute()
+            return bets_from_rows(response.data or [])
+        except Exception as e:
+            log_failure(e)
             return []
 
+    @identity_register
+    @cached(BET_TTL, "bets")
     def get_all_bets(self) -> List[Bet]:
         try:
-            response = supabase.table("bets").select("*").order("created_at", desc=True).execute()
-            bets = []
-            if hasattr(response, 'data') and response.data:
-                for row in response.data:
-                    bets.append(Bet(
-                        id=row["id"],
-                        week=row["week"],
-                        title=row["title"],
-                        description=row["description"],
-                        status=BetStatus(row["status"]),
-                        correct_answer=row.get("correct_answer"),
-                        created_at=row["created_at"],
-                        closed_at=row.get("closed_at"),
-                        resolved_at=row.get("resolved_at")
-                    ))
-            return bets
-        except Exception as e:
-            print(f"Error: {e}")
+            response = self.client.table("bets").select("*").order("created_at", desc=True).execute()
+            return bets_from_rows(response.data or [])
+        except Exception as e:
+            log_failure(e)
             return []
 
+    def _bet_rows(self, query: BetQuery) -> List[dict]:
+        try:
+            request = self.client.table("bets").select(BET_LIST_COLUMNS if query.summary else "*")
+            for column, op, value in query.conditions():
+                request = getattr(request, "in_" if op == "in" else op)(column, value)
+            request = request.order("created_at", desc=True).order("id", desc=True)
+            if query.limit:
+                request = request.limit(query.limit)
+            return request.execute().data or []
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    @invalidates("bets")
     def close_bet(self, bet_id: int) -> Tuple[bool, str]:
         try:
-            resp = supabase.table("bets").update({
+            resp = self.client.table("bets").update({
                 "status": BetStatus.CLOSED.value,
                 "closed_at": "now()"
             }).eq("id", bet_id).execute()
@@ -215,9 +258,10 @@ class SupabaseDatabase:
         except Exception as e:
             return False, f"Error: {str(e)}"
 
+    @invalidates("bets")
     def resolve_bet(self, bet_id: int, correct_answer: str) -> Tuple[bool, str]:
         try:
-            response = supabase.table("bets").update({
+            response = self.client.table("bets").update({
                 "correct_answer": correct_answer,
                 "status": BetStatus.RESOLVED.value,
                 "resolved_at": "now()"
@@ -228,11 +272,52 @@ class SupabaseDatabase:
         except Exception as e:
             return False, str(e)
 
+    # ==================== RESOLUTION JOBS ====================
+
+    def get_resolution_jobs(self, bet_ids: List[int]) -> Dict[int, ResolutionJob]:
+        if not bet_ids:
+            return {}
+        try:
+            response = self.client.table("resolution_jobs").select("*").in_("bet_id", list(bet_ids)).execute()
+            return {row["bet_id"]: job_from_row(row) for row in (response.data or [])}
+        except Exception as e:
+            log_failure(e)
+            return {}
+
+    def create_resolution_jobs(self, jobs: Dict[int, Tuple[str, Dict[int, int], Dict[int, int]]]) -> Tuple[bool, str, Dict[int, ResolutionJob]]:
+        """One round trip to the create_resolution_jobs function (see sql/postgres)"""
+        try:
+            resp = self.client.rpc("create_resolution_jobs", {
+                "p_jobs": {str(bet_id): {
+                    "correct_answer": correct_answer,
+                    "scores": {str(pred_id): points for pred_id, points in scores.items()},
+                    "deltas": {str(user_id): delta for user_id, delta in deltas.items()}
+                } for bet_id, (correct_answer, scores, deltas) in jobs.items()}
+            }).execute()
+            return True, "Resolution started", {row["bet_id"]: job_from_row(row) for row in (resp.data or [])}
+        except Exception as e:
+            return False, f"Error: {str(e)}", {}
+
+    @invalidates("bets", "predictions", "users", "leaderboard")
+    def apply_resolution_jobs(self, bet_ids: List[int], batch_size: int) -> Tuple[bool, str, Dict]:
+        """One round trip per batch to the apply_resolution_jobs function (see sql/postgres)"""
+        try:
+            resp = self.client.rpc("apply_resolution_jobs", {
+                "p_bet_ids": list(bet_ids),
+                "p_batch_size": batch_size
+            }).execute()
+            row = resp.data[0]
+            progress = {'applied': row["credits_applied"], 'total': row["credits_total"], 'done': row["done"]}
+            return True, "Resolution complete" if progress['done'] else "Resolution in progress", progress
+        except Exception as e:
+            return False, f"Error: {str(e)}", {}
+
     # ==================== PREDICTION OPERATIONS ====================
 
+    @invalidates("predictions:user:{user_id}", "predictions:bet:{bet_id}", "leaderboard")
     def create_prediction(self, bet_id: int, user_id: int, answer: str) -> Tuple[bool, str, Optional[int]]:
         try:
-            response = supabase.table("predictions").insert({
+            response = self.client.table("predictions").insert({
                 "bet_id": bet_id,
                 "user_id": user_id,
                 "answer": answer,
@@ -245,91 +330,185 @@ class SupabaseDatabase:
         except Exception as e:
             return False, f"Error: {str(e)}", None
 
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
     def get_prediction_by_user_bet(self, user_id: int, bet_id: int) -> Optional[Prediction]:
         try:
-            response = supabase.table("predictions").select("*").eq("user_id", user_id).eq("bet_id", bet_id).execute()
+            response = self.client.table("predictions").select("*").eq("user_id", user_id).eq("bet_id", bet_id).execute()
             if hasattr(response, 'data') and response.data:
-                row = response.data[0]
-                return Prediction(
-                    id=row["id"],
-                    bet_id=row["bet_id"],
-                    user_id=row["user_id"],
-                    answer=row["answer"],
-                    points_earned=row["points_earned"],
-                    created_at=row["created_at"]
-                )
+                return prediction_from_row(response.data[0])
             return None
         except Exception as e:
-            print(f"Error: {e}")
+            log_failure(e)
             return None
 
-    def get_predictions_by_bet(self, bet_id: int) -> List[Prediction]:
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
+    def get_predictions_for_user_bets(self, user_id: int, bet_ids: List[int]) -> Dict[int, Prediction]:
+        """A user's predictions on the given bets in one request, keyed by bet_id"""
+        if not bet_ids:
+            return {}
         try:
-            response = supabase.table("predictions").select("*").eq("bet_id", bet_id).execute()
-            predictions = []
+            response = self.client.table("predictions").select("*").eq("user_id", user_id).in_("bet_id", list(bet_ids)).execute()
+            predictions = {}
             if hasattr(response, 'data') and response.data:
                 for row in response.data:
-                    predictions.append(Prediction(
-                        id=row["id"],
-                        bet_id=row["bet_id"],
-                        user_id=row["user_id"],
-                        answer=row["answer"],
-                        points_earned=row["points_earned"],
-                        created_at=row["created_at"]
-                    ))
+                    predictions[row["bet_id"]] = prediction_from_row(row)
             return predictions
         except Exception as e:
-            print(f"Error: {e}")
+            log_failure(e)
+            return {}
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:bet:{bet_id}")
+    def get_predictions_by_bet(self, bet_id: int) -> List[Prediction]:
+        try:
+            response = self.client.table("predictions").select("*").eq("bet_id", bet_id).execute()
+            return predictions_from_rows(response.data or [])
+        except Exception as e:
+            log_failure(e)
             return []
 
+    @cached(BET_TTL, "predictions", bet_prediction_tags)
+    def get_predictions_for_bets(self, bet_ids: List[int]) -> Dict[int, List[Prediction]]:
+        if not bet_ids:
+            return {}
+        try:
+            response = self.client.table("predictions").select("*").in_("bet_id", list(bet_ids)).execute()
+            grouped = {bet_id: [] for bet_id in bet_ids}
+            if hasattr(response, 'data') and response.data:
+                for row in response.data:
+                    grouped[row["bet_id"]].append(prediction_from_row(row))
+            return grouped
+        except Exception as e:
+            log_failure(e)
+            return {}
+
+    @identity_register
+    @cached(BET_TTL, "predictions", "predictions:user:{user_id}")
     def get_predictions_by_user(self, user_id: int) -> List[Prediction]:
         try:
-            response = supabase.table("predictions").select("*").eq("user_id", user_id).execute()
-            predictions = []
+            response = self.client.table("predictions").select("*").eq("user_id", user_id).execute()
+            return predictions_from_rows(response.data or [])
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    @identity_register
+    @cached(BET_TTL, "bets", "predictions", "predictions:user:{user_id}")
+    def get_user_bet_history(self, user_id: int, limit: Optional[int] = None) -> List[Tuple[Bet, Prediction]]:
+        """(Bet, Prediction) pairs for a user in one request, newest week first"""
+        try:
+            query = self.client.table("bets").select("*, predictions!inner(*)").eq("predictions.user_id", user_id).order("week", desc=True).order("created_at", desc=True)
+            if limit:
+                query = query.limit(limit)
+            response = query.execute()
+            history = []
             if hasattr(response, 'data') and response.data:
                 for row in response.data:
-                    predictions.append(Prediction(
-                        id=row["id"],
-                        bet_id=row["bet_id"],
-                        user_id=row["user_id"],
-                        answer=row["answer"],
-                        points_earned=row["points_earned"],
-                        created_at=row["created_at"]
-                    ))
-            return predictions
+                    bet = bet_from_row(row)
+                    for pred_row in row["predictions"]:
+                        history.append((bet, prediction_from_row(pred_row)))
+            return history
         except Exception as e:
-            print(f"Error: {e}")
+            log_failure(e)
             return []
 
+    @cached(BET_TTL, "bets", "predictions", "predictions:bet:{bet_id}")
+    def get_bet_summary(self, bet_id: int) -> Optional[dict]:
+        """A bet with its predictions and their usernames in one request (never selects password_hash)"""
+        try:
+            response = self.client.table("bets").select("*, predictions(id, user_id, answer, points_earned, created_at, users(username))").eq("id", bet_id).execute()
+            if not hasattr(response, 'data') or not response.data:
+                return None
+            row = response.data[0]
+            prediction_details = []
+            for pred in sorted(row["predictions"], key=lambda p: p["created_at"]):
+                if pred.get("users"):
+                    prediction_details.append({
+                        'id': pred["id"],
+                        'user_id': pred["user_id"],
+                        'username': pred["users"]["username"],
+                        'answer': pred["answer"],
+                        'points_earned': pred["points_earned"],
+                        'submitted_at': pred["created_at"]
+                    })
+            return {
+                'bet': bet_from_row(row),
+                'predictions': prediction_details,
+                'total_predictions': len(row["predictions"])
+            }
+        except Exception as e:
+            log_failure(e)
+            return None
+
+    @invalidates("predictions", "leaderboard")
     def update_prediction_points(self, prediction_id: int, points: int) -> Tuple[bool, str]:
         try:
-            resp = supabase.table("predictions").update({"points_earned": points}).eq("id", prediction_id).execute()
-            print(f"update_prediction_points: Attempted to set id={prediction_id}, points={points}, resp={resp}")
+            resp = self.client.table("predictions").update({"points_earned": points}).eq("id", prediction_id).execute()
             if hasattr(resp, 'data') and resp.data:
-                print(f"SUCCESS: Updated prediction {prediction_id} with {points} points.")
+                log(logging.DEBUG, "prediction_points_updated", prediction_id=prediction_id, points=points)
                 return True, "Points updated"
-            else:
-                print(f"FAIL: Could not update prediction {prediction_id} with {points} points. resp={resp}")
-                return False, "Failed to update points"
+            log(logging.WARNING, "prediction_points_not_updated", prediction_id=prediction_id, points=points)
+            return False, "Failed to update points"
         except Exception as e:
-            print(f"Error updating prediction points: {e}")
+            log_failure(e)
             return False, f"Error: {str(e)}"
 
-    def update_user_reedz(self, user_id: int, amount: int) -> Tuple[bool, str]:
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_week_series(self, user_id: int) -> Optional[WeekSeries]:
         try:
-            user = self.get_user_by_id(user_id)
-            if not user:
-                print(f"update_user_reedz: User {user_id} NOT FOUND")
-                return False, "User not found"
-            new_balance = user.reedz_balance + amount
-            resp = supabase.table("users").update({"reedz_balance": new_balance}).eq("id", user_id).execute()
-            print(f"update_user_reedz: User {user_id} amount={amount}, new_balance={new_balance}, resp={resp}")
-            if hasattr(resp, 'data') and resp.data:
-                return True, "Reedz balance updated"
-            else:
-                print(f"FAIL: Could not update user {user_id}'s balance. resp={resp}")
-                return False, "Failed to update Reedz balance"
+            response = self.client.table("user_week_series").select("user_id, points, totals, ranks").eq("user_id", user_id).execute()
+            if hasattr(response, 'data') and response.data:
+                return series_from_row(response.data[0])
+            return None
+        except Exception as e:
+            log_failure(e)
+            return None
+
+    # ==================== REEDZ LEDGER ====================
+
+    @invalidates("users", "leaderboard", user_tags)
+    def increment_reedz(self, deltas: Dict[int, int], source: LedgerSource = LedgerSource.ADMIN_ADJUSTMENT,
+                        bet_id: Optional[int] = None) -> Tuple[bool, str, Dict[int, int]]:
+        """Append the deltas to the ledger server-side; returns user_id -> new balance"""
+        if not deltas:
+            return True, "Nothing to update", {}
+        try:
+            resp = self.client.rpc("increment_reedz", {
+                "p_deltas": {str(user_id): delta for user_id, delta in deltas.items()},
+                "p_source": source.value,
+                "p_bet_id": bet_id
+            }).execute()
+            balances = {row["id"]: row["reedz_balance"] for row in (resp.data or [])}
+            return True, "Reedz balances updated", balances
+        except Exception as e:
+            log_failure(e)
+            return False, f"Error: {str(e)}", {}
+
+    @cached(USER_TTL, "user:{user_id}", "users")
+    def get_reedz_history(self, user_id: int, limit: Optional[int] = 50) -> List[LedgerEntry]:
+        try:
+            query = self.client.table("reedz_ledger").select("*").eq("user_id", user_id).order("id", desc=True)
+            if limit:
+                query = query.limit(limit)
+            response = query.execute()
+            return [ledger_from_row(row) for row in (response.data or [])]
+        except Exception as e:
+            log_failure(e)
+            return []
+
+    def snapshot_balances(self, bet_ids: Optional[List[int]] = None) -> Tuple[bool, str]:
+        try:
+            resp = self.client.rpc("snapshot_reedz", {} if bet_ids is None else {"p_bet_ids": bet_ids}).execute()
+            return True, f"Snapshotted {resp.data} balances"
         except Exception as e:
-            print(f"Error updating user Reedz: {e}")
             return False, f"Error: {str(e)}"
 
+    @invalidates("users", "leaderboard")
+    def reset_season(self) -> Tuple[bool, str]:
+        try:
+            resp = self.client.rpc("reset_reedz_season", {}).execute()
+            return True, f"Reset {resp.data} balances"
+        except Exception as e:
+            return False, f"Error: {str(e)}"
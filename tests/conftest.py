@@ -0,0 +1,160 @@
+"""
+Shared fixtures: a counting SQLite backend and round-trip budgets
+
+Round trips are counted at the transport, as in production traces: every
+call that sends SQL to SQLite (Supabase counts each request in its client).
+A per-row query inside a backend method counts as many times as it runs.
+
+Set REEDZ_TEST_LATENCY (seconds) to inject that delay into every round
+trip; the wall-clock time of each flow is printed after the run.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from auth import hash_password  # noqa: E402
+from models import AnswerType, BetStatus, Prediction, UserRole  # noqa: E402
+from query_cache import QueryCache  # noqa: E402
+from sqlite_db import SqliteDatabase, _Connection  # noqa: E402
+from tracing import Trace, trace_run  # noqa: E402
+
+PASSWORD = "secret1"
+
+# Seconds added to every round trip, standing in for the network to Supabase
+LATENCY = float(os.getenv("REEDZ_TEST_LATENCY", "0"))
+
+
+class SlowConnection(_Connection):
+    latency = 0.0
+
+    def _sent(self):
+        super()._sent()
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class CountingDatabase(SqliteDatabase):
+    """SQLite backend with its own query cache that sleeps latency seconds on every round trip"""
+
+    connection_class = SlowConnection
+
+    def __init__(self, path: str, latency: float = 0.0):
+        super().__init__(path, cache=QueryCache())
+        self._conn.latency = latency
+
+
+def round_trips(trace: Trace) -> int:
+    """Round trips to the database; cache and identity map hits make none"""
+    return trace.round_trips
+
+
+def backend_calls(trace: Trace) -> int:
+    """Backend methods that made at least one round trip"""
+    return sum(1 for call in trace.calls if call.round_trips)
+
+
+@dataclass
+class FlowRun:
+    flow: str
+    budget: int
+    trace: Optional[Trace] = None
+    ms: float = 0.0
+
+
+_results: List[FlowRun] = []
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh counting backend, installed as the process-wide database"""
+    counting = CountingDatabase(str(tmp_path / "reedz.db"), latency=LATENCY)
+    monkeypatch.setattr(database, "_database", counting)
+    return counting
+
+
+@pytest.fixture
+def measure():
+    """
+    with measure("flow", budget) as run: ... fails if the flow makes more than
+    budget round trips. Flows that run elsewhere (AppTest) set run.trace.
+    """
+    @contextmanager
+    def run_flow(flow: str, budget: int):
+        run = FlowRun(flow, budget)
+        start = time.perf_counter()
+        with trace_run(f"test {flow}") as trace:
+            yield run
+        run.ms = (time.perf_counter() - start) * 1000
+        run.trace = run.trace or trace
+        _results.append(run)
+        untraced = run.trace.untraced_round_trips
+        assert untraced == 0, f"{flow}: {untraced} statements ran outside a traced backend call"
+        made = round_trips(run.trace)
+        calls = ", ".join(f"{totals['method']} {totals['round_trips']}" for totals in run.trace.by_method()
+                          if totals['round_trips'])
+        assert made <= budget, f"{flow}: {made} round trips, budget is {budget} ({calls})"
+    return run_flow
+
+
+def seed(db: SqliteDatabase, members: int = 3, bets: int = 2, weeks: int = 1) -> dict:
+    """An admin, members, and bets per week that every member has predicted on"""
+    _, _, admin_id = db.create_user("admin1", hash_password(PASSWORD), UserRole.ADMIN)
+    member_ids = [db.create_user(f"user{i}", hash_password(PASSWORD), UserRole.MEMBER)[2] for i in range(members)]
+    bet_ids = []
+    for week in range(1, weeks + 1):
+        for i in range(bets):
+            _, _, bet_id = db.create_bet(week, f"Week {week} bet {i}", "desc", "numeric", admin_id)
+            bet_ids.append(bet_id)
+            for n, user_id in enumerate(member_ids):
+                db.create_prediction(bet_id, user_id, str(10 + n))
+    return {'admin_id': admin_id, 'member_ids': member_ids, 'bet_ids': bet_ids}
+
+
+def reference_scores(predictions: List[Prediction], correct_answer: str, answer_type: AnswerType) -> Dict[int, int]:
+    """Scores computed one prediction at a time, the plain statement of the scoring rules"""
+    scores = {}
+    if answer_type == AnswerType.NUMERIC:
+        correct_value = float(correct_answer)
+        differences = []
+        for pred in predictions:
+            try:
+                pred_value = float(pred.answer)
+                differences.append((pred.id, abs(pred_value - correct_value), pred_value == correct_value))
+            except ValueError:
+                scores[pred.id] = 0
+        differences.sort(key=lambda x: x[1])
+        current_rank = 0
+        previous_diff = None
+        for i, (pred_id, diff, is_exact) in enumerate(differences):
+            if previous_diff is None or diff != previous_diff:
+                current_rank = i
+            scores[pred_id] = max(21 - current_rank, 1) + (5 if is_exact else 0)
+            previous_diff = diff
+    else:
+        correct_lower = correct_answer.strip().lower()
+        for pred in predictions:
+            scores[pred.id] = 26 if pred.answer.strip().lower() == correct_lower else 0
+    return scores
+
+
+def close_all(db: SqliteDatabase):
+    for bet in db.get_bets_by_status(BetStatus.OPEN):
+        db.close_bet(bet.id)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section(f"round trips (latency {LATENCY * 1000:g} ms per round trip)")
+    terminalreporter.write_line(f"{'flow':<40} {'round trips':>11} {'budget':>6} {'backend calls':>13} {'wall ms':>9}")
+    for run in _results:
+        terminalreporter.write_line(f"{run.flow:<40} {round_trips(run.trace):>11} {run.budget:>6} "
+                                    f"{backend_calls(run.trace):>13} {run.ms:>9.1f}")
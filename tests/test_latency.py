@@ -0,0 +1,52 @@
+"""
+Wall-clock time under injected per-round-trip latency
+
+With a fixed delay on every round trip, a flow costs at least its round
+trips times the delay. The number of round trips, and so the latency a
+user waits out, stays the same however many rows the flow handles.
+"""
+import pytest
+
+from auth import login_user
+from scoring import ScoringManager
+from conftest import PASSWORD, CountingDatabase, close_all, round_trips, seed
+import database
+
+# Seconds per round trip; wall-clock times are printed, only the lower bound is asserted
+DELAY = 0.01
+
+
+@pytest.fixture
+def slow_db(tmp_path, monkeypatch):
+    def build(name: str) -> CountingDatabase:
+        slow = CountingDatabase(str(tmp_path / name), latency=DELAY)
+        monkeypatch.setattr(database, "_database", slow)
+        return slow
+    return build
+
+
+def assert_latency_paid(run):
+    expected = round_trips(run.trace) * DELAY * 1000
+    assert run.ms >= expected, f"{run.flow}: {run.ms:.0f} ms, latency of {expected:.0f} ms was not injected"
+
+
+def test_login_latency(slow_db, measure):
+    db = slow_db("reedz.db")
+    seed(db)
+    with measure(f"login_user @ {DELAY * 1000:g} ms", budget=1) as run:
+        assert login_user("user1", PASSWORD)[0]
+    assert_latency_paid(run)
+
+
+def test_resolve_latency_does_not_scale_with_rows(slow_db, measure):
+    made = []
+    for members in (3, 40):
+        db = slow_db(f"reedz_{members}.db")
+        ids = seed(db, members=members, bets=1)
+        close_all(db)
+        admin = db.get_user_by_id(ids['admin_id'])
+        with measure(f"resolve_bet ({members} predictions) @ {DELAY * 1000:g} ms", budget=28) as run:
+            assert ScoringManager(db).resolve_bet(admin, ids['bet_ids'][0], "11")[0]
+        assert_latency_paid(run)
+        made.append(round_trips(run.trace))
+    assert made[0] == made[1], f"round trips grew with predictions: {made}"
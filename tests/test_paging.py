@@ -0,0 +1,24 @@
+"""
+Keyset paging against a server that caps rows per response
+
+PostgREST truncates every response to its max-rows, so a page size above
+that cap must not end the walk after the first (short) page.
+"""
+from models import UserRole
+from conftest import CountingDatabase
+
+
+class CappedDatabase(CountingDatabase):
+    """Returns at most max_page_size rows per page, like PostgREST's max-rows"""
+
+    max_page_size = 3
+
+    def _fetch_page(self, table, columns, filters, after_id, page_size, descending):
+        return super()._fetch_page(table, columns, filters, after_id, min(page_size, self.max_page_size), descending)
+
+
+def test_walk_survives_a_server_row_cap(tmp_path):
+    db = CappedDatabase(str(tmp_path / "reedz.db"))
+    for i in range(7):
+        db.create_user(f"user{i}", "x", UserRole.MEMBER)
+    assert [u.username for u in db.iter_users(page_size=500)] == [f"user{i}" for i in range(7)]
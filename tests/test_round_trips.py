@@ -0,0 +1,138 @@
+"""
+Round-trip budgets for every user flow
+
+Each flow runs against the counting backend and fails if it needs more
+round trips than its budget. Flows that touch many rows run at two sizes
+with the same budget, so a per-row query (N+1) fails instead of just
+raising the number.
+
+Budgets are SQLite round trips. Resolution is mostly apply_resolution_jobs,
+one request on Supabase but a fixed sequence of statements here.
+"""
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from auth import login_user, register_user
+from betting import BettingManager
+from models import AnswerType, BetStatus
+from scoring import ScoringManager
+from tracing import recent_traces
+from conftest import PASSWORD, close_all, seed
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app_web.py")
+
+SIZES = [3, 40]
+
+
+def test_login_user(db, measure):
+    seed(db)
+    with measure("login_user", budget=1):
+        success, _, user_id = login_user("user0", PASSWORD)
+    assert success and user_id
+
+
+def test_register_user(db, measure):
+    seed(db)
+    with measure("register_user", budget=2):
+        success, message, _ = register_user("newcomer", PASSWORD)
+    assert success, message
+
+
+def test_create_bet(db, measure):
+    ids = seed(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    with measure("create_bet", budget=1):
+        success, message, bet_id = BettingManager(db).create_bet(admin, "Fresh bet", "desc", 1, AnswerType.NUMERIC)
+    assert success, message
+    assert db.get_bet_by_id(bet_id).answertype == AnswerType.NUMERIC
+
+
+def test_submit_prediction(db, measure):
+    ids = seed(db)
+    user = db.get_user_by_id(ids['member_ids'][0])
+    _, _, bet_id = db.create_bet(1, "Fresh bet", "desc", "numeric", ids['admin_id'])
+    with measure("submit_prediction", budget=2):
+        success, message = BettingManager(db).submit_prediction(user, bet_id, "42")
+    assert success, message
+
+
+@pytest.mark.parametrize("members", SIZES)
+def test_resolve_bet(db, measure, members):
+    ids = seed(db, members=members, bets=1)
+    close_all(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    bet_id = ids['bet_ids'][0]
+    with measure(f"resolve_bet ({members} predictions)", budget=28):
+        success, message, details = ScoringManager(db).resolve_bet(admin, bet_id, "11")
+    assert success, message
+    assert details['total_predictions'] == members
+    assert db.get_bet_by_id(bet_id).status == BetStatus.RESOLVED
+
+
+@pytest.mark.parametrize("members", SIZES)
+def test_preview_resolution(db, measure, members):
+    ids = seed(db, members=members, bets=1)
+    close_all(db)
+    with measure(f"preview_resolution ({members} predictions)", budget=2):
+        success, message, preview = ScoringManager(db).preview_resolution(ids['bet_ids'][0], ["10", "11", "12"])
+    assert success, message
+    assert len(preview['predictions']) == members
+    assert [p['exact_answers'] for p in preview['previews']] == [1, 1, 1]
+
+
+@pytest.mark.parametrize("members, bets", [(3, 2), (40, 6)])
+def test_resolve_week(db, measure, members, bets):
+    ids = seed(db, members=members, bets=bets)
+    close_all(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    answers = {bet_id: "12" for bet_id in ids['bet_ids']}
+    with measure(f"resolve_week ({members} members, {bets} bets)", budget=28):
+        success, message, _ = ScoringManager(db).resolve_week(admin, 1, answers)
+    assert success, message
+
+
+@pytest.mark.parametrize("members", SIZES)
+def test_get_leaderboard(db, measure, members):
+    seed(db, members=members)
+    scoring = ScoringManager(db)
+    with measure(f"get_leaderboard ({members} members)", budget=1):
+        first = scoring.get_leaderboard(10)
+        again = scoring.get_leaderboard(10)
+    assert len(first) == min(members + 1, 10)
+    assert again == first
+
+
+def run_page(db, username: str) -> AppTest:
+    user = db.get_user_by_username(username)
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.session_state["user"] = db.get_user_by_id(user.id)
+    at.session_state["user_id"] = user.id
+    at.session_state["role"] = user.role
+    at.run()
+    assert not at.exception, [e.value for e in at.exception]
+    return at
+
+
+def page_trace(page: str):
+    """The app's own trace of its latest run of page"""
+    return next(trace for trace in recent_traces() if trace.label.startswith(page))
+
+
+@pytest.mark.parametrize("weeks", [1, 6])
+def test_member_page(db, measure, weeks):
+    seed(db, members=5, bets=3, weeks=weeks)
+    with measure(f"member_page ({weeks * 3} bets)", budget=6) as run:
+        run_page(db, "user1")
+        run.trace = page_trace("member_page")
+
+
+@pytest.mark.parametrize("weeks", [1, 6])
+def test_admin_page(db, measure, weeks):
+    ids = seed(db, members=5, bets=3, weeks=weeks)
+    for bet_id in ids['bet_ids'][::2]:
+        db.close_bet(bet_id)
+    with measure(f"admin_page ({weeks * 3} bets)", budget=6) as run:
+        run_page(db, "admin1")
+        run.trace = page_trace("admin_page")
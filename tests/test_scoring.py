@@ -0,0 +1,148 @@
+"""
+Scoring, previews and resolution, checked against reference_scores
+
+"nan" and "inf" parse as floats but can't be ranked: they are rejected as
+answers, and any already stored score nothing, like other non-numbers.
+"""
+import pytest
+
+from betting import BettingManager
+from models import AnswerType, BetStatus, Prediction, UserRole
+from query_cache import QueryCache
+from scoring import ScoringManager
+from sqlite_db import SqliteDatabase
+from conftest import close_all, reference_scores, seed
+
+NON_FINITE = ["nan", "NaN", "inf", "-inf", "Infinity"]
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("correct", ["100", "7.5"])
+def test_non_finite_predictions_score_nothing(correct):
+    answers = ["100", "nan", "98", "inf", "not a number", "7.5", "-inf", "98", "101"]
+    predictions = [Prediction(i + 1, 1, i + 1, answer, 0, "") for i, answer in enumerate(answers)]
+    finite = [p for p in predictions if p.answer not in ("nan", "inf", "-inf")]
+    expected = {p.id: 0 for p in predictions}
+    expected.update(reference_scores(finite, correct, AnswerType.NUMERIC))
+    assert ScoringManager(db=None)._calculate_scores(predictions, correct, AnswerType.NUMERIC) == expected
+
+
+@pytest.mark.parametrize("answer", NON_FINITE)
+def test_submit_prediction_rejects_non_finite(db, answer):
+    ids = seed(db, bets=0)
+    _, _, bet_id = db.create_bet(1, "Total points", "desc", "numeric", ids['admin_id'])
+    user = db.get_user_by_id(ids['member_ids'][0])
+    success, _ = BettingManager(db).submit_prediction(user, bet_id, answer)
+    assert not success
+    assert db.get_prediction_by_user_bet(user.id, bet_id) is None
+
+
+@pytest.mark.parametrize("answer", NON_FINITE)
+def test_resolution_rejects_non_finite(db, answer):
+    ids = seed(db, bets=1)
+    close_all(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    bet_id = ids['bet_ids'][0]
+    scoring = ScoringManager(db)
+    assert not scoring.preview_resolution(bet_id, ["10", answer])[0]
+    assert not scoring.resolve_bet(admin, bet_id, answer)[0]
+    assert not scoring.resolve_week(admin, 1, {bet_id: answer})[0]
+    assert db.get_resolution_jobs([bet_id]) == {}
+
+
+def test_text_preview_matches_resolution_scores(db):
+    ids = seed(db, members=0, bets=0)
+    _, _, bet_id = db.create_bet(1, "Who wins", "desc", "text", ids['admin_id'])
+    for i, answer in enumerate(["Yes", "no ", " YES", "maybe", "yes"]):
+        _, _, user_id = db.create_user(f"fan{i}", "x", UserRole.MEMBER)
+        db.create_prediction(bet_id, user_id, answer)
+    scoring = ScoringManager(db)
+    predictions = db.get_predictions_by_bet(bet_id)
+    success, _, preview = scoring.preview_resolution(bet_id, ["yes", "No", "nobody"])
+    assert success
+    for candidate in preview['previews']:
+        expected = scoring._calculate_scores(predictions, candidate['correct_answer'], AnswerType.TEXT)
+        assert candidate['scores'] == expected == reference_scores(predictions, candidate['correct_answer'], AnswerType.TEXT)
+
+
+def test_resolution_snapshots_only_credited_users(db):
+    ids = seed(db, members=3, bets=1)
+    close_all(db)
+    _, _, bystander = db.create_user("bystander", "x", UserRole.MEMBER)
+    db.increment_reedz({bystander: 7})
+    admin = db.get_user_by_id(ids['admin_id'])
+    bet_id = ids['bet_ids'][0]
+    success, _, details = ScoringManager(db).resolve_bet(admin, bet_id, "11")
+    assert success
+    for p in db.get_predictions_by_bet(bet_id):
+        assert db.get_user_by_id(p.user_id).reedz_balance == details['scores'][p.id]
+    # The credited users were folded by the resolution; only the bystander's tail is left
+    assert db.snapshot_balances([bet_id]) == (True, "Snapshotted 0 balances")
+    assert db.snapshot_balances() == (True, "Snapshotted 1 balances")
+    assert db.get_user_by_id(bystander).reedz_balance == 7
+
+
+@pytest.mark.parametrize("rival_answer", ["11", "15"])
+def test_losing_a_resolution_race_uses_the_stored_job(db, monkeypatch, rival_answer):
+    ids = seed(db, members=3, bets=1)
+    close_all(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    bet_id = ids['bet_ids'][0]
+    rival_scores = {p.id: 1 for p in db.get_predictions_by_bet(bet_id)}
+    create = db.create_resolution_jobs
+
+    def rival_first(jobs):
+        # Another admin's job for the same bet lands between our read and our insert
+        create({bet_id: (rival_answer, rival_scores, {})})
+        return create(jobs)
+    monkeypatch.setattr(db, "create_resolution_jobs", rival_first)
+
+    success, message, details = ScoringManager(db).resolve_bet(admin, bet_id, "11")
+    if rival_answer == "11":
+        assert success, message
+        assert details['scores'] == rival_scores
+    else:
+        assert not success
+        assert "is already being resolved with answer '15'" in message
+    assert db.get_resolution_jobs([bet_id])[bet_id].scores == rival_scores
+
+
+def test_batched_prediction_read_sees_new_predictions(db):
+    ids = seed(db, members=2, bets=1)
+    bet_id = ids['bet_ids'][0]
+    assert len(db.get_predictions_for_bets([bet_id])[bet_id]) == 2
+    _, _, user_id = db.create_user("late", "x", UserRole.MEMBER)
+    db.create_prediction(bet_id, user_id, "12")
+    assert len(db.get_predictions_for_bets([bet_id])[bet_id]) == 3
+
+
+def test_resolution_scores_predictions_the_cache_has_not_seen(db, tmp_path):
+    ids = seed(db, members=2, bets=1)
+    bet_id = ids['bet_ids'][0]
+    db.get_predictions_for_bets([bet_id])
+    # Another app process takes a prediction; this process's cache never hears of it
+    other = SqliteDatabase(str(tmp_path / "reedz.db"), cache=QueryCache())
+    _, _, user_id = other.create_user("late", "x", UserRole.MEMBER)
+    other.create_prediction(bet_id, user_id, "11")
+    close_all(db)
+    admin = db.get_user_by_id(ids['admin_id'])
+    success, _, details = ScoringManager(db).resolve_bet(admin, bet_id, "11")
+    assert success
+    assert details['total_predictions'] == 3
+
+
+def test_open_bets_are_not_resolved(db):
+    ids = seed(db, members=2, bets=2)
+    open_bet, closed_bet = ids['bet_ids']
+    db.close_bet(closed_bet)
+    admin = db.get_user_by_id(ids['admin_id'])
+    scoring = ScoringManager(db)
+    success, message, _ = scoring.resolve_bet(admin, open_bet, "11")
+    assert not success
+    assert "before resolving it" in message
+    assert not scoring.resolve_week(admin, 1, {open_bet: "11", closed_bet: "11"})[0]
+    assert db.get_resolution_jobs([open_bet, closed_bet]) == {}
+    # Storage has the last word when the caller's copy of the bet is stale
+    assert db.create_resolution_jobs({open_bet: ("11", {}, {})}) == (True, "Resolution started", {})
+    assert db.get_bet_by_id(open_bet).status == BetStatus.OPEN
+    assert scoring.resolve_week(admin, 1, {closed_bet: "11"})[0]
@@ -0,0 +1,52 @@
+"""
+Week series and frozen standings don't depend on resolution order
+
+A user is ranked from the first week holding one of their resolved
+predictions, so resolving the same bets in any order gives the same ranks.
+"""
+import pytest
+
+from models import UserRole
+from query_cache import QueryCache
+from scoring import ScoringManager
+from sqlite_db import SqliteDatabase
+
+# bet title -> (week, answers by username)
+BETS = {
+    "Week 1 opener": (1, {"ann": "10"}),
+    "Week 1 total": (1, {"ann": "3", "bob": "5"}),
+    "Week 2 total": (2, {"ann": "20", "bob": "22", "cat": "25"}),
+}
+
+
+def resolve_in_order(path: str, order) -> tuple:
+    db = SqliteDatabase(path, cache=QueryCache())
+    _, _, admin_id = db.create_user("admin1", "x", UserRole.ADMIN)
+    users = {name: db.create_user(name, "x", UserRole.MEMBER)[2] for name in ("ann", "bob", "cat")}
+    bet_ids = {}
+    for title, (week, answers) in BETS.items():
+        _, _, bet_id = db.create_bet(week, title, "desc", "numeric", admin_id)
+        bet_ids[title] = bet_id
+        for name, answer in answers.items():
+            db.create_prediction(bet_id, users[name], answer)
+        db.close_bet(bet_id)
+    admin = db.get_user_by_id(admin_id)
+    for title in order:
+        assert ScoringManager(db).resolve_bet(admin, bet_ids[title], "21")[0]
+    series = {name: db.get_week_series(user_id) for name, user_id in users.items()}
+    standings = {week: [(row['username'], row['rank'], row['total_points']) for row in db.get_week_leaderboard(week)]
+                 for week in db.get_frozen_weeks()}
+    return {name: (s.points, s.totals, s.ranks) for name, s in series.items() if s}, standings
+
+
+@pytest.mark.parametrize("order", [
+    ["Week 2 total", "Week 1 total", "Week 1 opener"],
+    ["Week 1 total", "Week 2 total", "Week 1 opener"],
+    ["Week 1 opener", "Week 2 total", "Week 1 total"],
+])
+def test_ranks_do_not_depend_on_resolution_order(tmp_path, order):
+    expected = resolve_in_order(str(tmp_path / "in_week_order.db"), list(BETS))
+    assert resolve_in_order(str(tmp_path / "reordered.db"), order) == expected
+    series, standings = expected
+    assert series["cat"][2] == [None, 3]
+    assert [name for name, _, _ in standings[1]] == ["ann", "bob"]
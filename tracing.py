@@ -0,0 +1,288 @@
+"""
+Query tracing and logging for the storage backends
+
+Every public method of a @traced backend is timed while a trace_run() is
+open: latency, rows returned, an estimate of the payload, database round
+trips and the app function that called it. Runs are one Streamlit script
+run, one CLI command or one worker task; the most recent are kept for the
+admin Performance tab and, with REEDZ_TRACE_FILE set, appended to that
+file as JSON lines.
+
+Logging goes to the "reedz" logger at REEDZ_LOG_LEVEL (default WARNING)
+as `event key=value ...`.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, is_dataclass
+from enum import Enum
+from types import GeneratorType
+from typing import Any, Dict, Iterator, List, Optional
+
+# Finished runs kept in memory for the Performance tab
+MAX_TRACES = 50
+
+# Modules whose frames are skipped when looking for a call's caller
+_LAYER_MODULES = {"tracing", "database", "sqlite_db", "supabase_db", "query_cache", "identity_map", "functools", "contextlib"}
+
+logger = logging.getLogger("reedz")
+
+
+class _KeyValueFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        event_fields = getattr(record, "fields", None)
+        if event_fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in event_fields.items())
+        return line
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(_KeyValueFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv("REEDZ_LOG_LEVEL", "WARNING").upper())
+    logger.propagate = False
+
+
+_configure_logger()
+
+
+def log(level: int, event: str, **event_fields):
+    """Log an event with key=value fields; nothing is formatted unless the level is enabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": event_fields})
+
+
+def log_failure(error: Exception):
+    """Log a backend call that failed and fell back to an empty result, naming the calling method"""
+    if logger.isEnabledFor(logging.ERROR):
+        method = sys._getframe(1).f_code.co_name
+        logger.error("query_failed", extra={"fields": {"method": method, "error": str(error)}})
+
+
+# ==================== TRACES ====================
+
+@dataclass
+class CallRecord:
+    """One traced backend call; zero round trips means it was served from the cache or identity map"""
+    method: str
+    caller: str
+    ms: float = 0.0
+    rows: int = 0
+    payload_bytes: int = 0
+    round_trips: int = 0
+    error: bool = False
+
+
+@dataclass
+class Trace:
+    """The backend calls made during one Streamlit run, CLI command or worker task"""
+    label: str
+    started_at: float
+    ms: float = 0.0
+    calls: List[CallRecord] = field(default_factory=list)
+    untraced_round_trips: int = 0
+
+    @property
+    def round_trips(self) -> int:
+        return sum(call.round_trips for call in self.calls) + self.untraced_round_trips
+
+    def by_method(self) -> List[dict]:
+        """Per-method totals, most time spent first"""
+        methods: Dict[str, dict] = {}
+        for call in self.calls:
+            totals = methods.setdefault(call.method, {
+                'method': call.method, 'calls': 0, 'round_trips': 0, 'rows': 0,
+                'payload_bytes': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'callers': set()
+            })
+            totals['calls'] += 1
+            totals['round_trips'] += call.round_trips
+            totals['rows'] += call.rows
+            totals['payload_bytes'] += call.payload_bytes
+            totals['total_ms'] += call.ms
+            totals['max_ms'] = max(totals['max_ms'], call.ms)
+            totals['callers'].add(call.caller)
+        for totals in methods.values():
+            totals['callers'] = sorted(totals['callers'])
+        return sorted(methods.values(), key=lambda totals: -totals['total_ms'])
+
+    def to_dict(self) -> dict:
+        return {
+            'label': self.label,
+            'started_at': self.started_at,
+            'ms': self.ms,
+            'round_trips': self.round_trips,
+            'rows': sum(call.rows for call in self.calls),
+            'payload_bytes': sum(call.payload_bytes for call in self.calls),
+            'by_method': self.by_method(),
+            'calls': [vars(call) for call in self.calls]
+        }
+
+
+_local = threading.local()
+_traces: deque = deque(maxlen=MAX_TRACES)
+_traces_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def trace_run(label: str) -> Iterator[Trace]:
+    """Record backend calls on this thread under label; nested runs fold into the outer one"""
+    if current_trace() is not None:
+        yield current_trace()
+        return
+    trace = Trace(label=label, started_at=time.time())
+    _local.trace = trace
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.ms = (time.perf_counter() - start) * 1000
+        _local.trace = None
+        with _traces_lock:
+            _traces.append(trace)
+        _write_trace(trace)
+
+
+def recent_traces() -> List[Trace]:
+    """Finished runs, newest first"""
+    with _traces_lock:
+        return list(reversed(_traces))
+
+
+def dump_traces(traces: Optional[List[Trace]] = None) -> str:
+    """Runs (default: every kept one) as a JSON array"""
+    return json.dumps([trace.to_dict() for trace in (recent_traces() if traces is None else traces)], indent=2)
+
+
+def _write_trace(trace: Trace):
+    path = os.getenv("REEDZ_TRACE_FILE")
+    if not path:
+        return
+    try:
+        with _traces_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace.to_dict()) + "\n")
+    except OSError as e:
+        log(logging.WARNING, "trace_write_failed", path=path, error=str(e))
+
+
+def count_round_trip():
+    """Note one request or statement sent to the database by this thread"""
+    call = getattr(_local, "call", None)
+    if call is not None:
+        call.round_trips += 1
+    elif current_trace() is not None:
+        current_trace().untraced_round_trips += 1
+
+
+# ==================== BACKEND WRAPPING ====================
+
+def _caller() -> str:
+    """module.function of the nearest frame outside the storage layer"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _LAYER_MODULES:
+            if module == "__main__":
+                # Streamlit runs the page script as __main__
+                module = os.path.splitext(os.path.basename(frame.f_globals.get("__file__", "__main__")))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _row_count(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, tuple) and result and isinstance(result[0], bool):
+        # (success, message, payload) results
+        return _row_count(result[2]) if len(result) > 2 else 0
+    if isinstance(result, dict):
+        return sum(len(value) if isinstance(value, list) else 1 for value in result.values())
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if is_dataclass(value):
+        return {f.name: getattr(value, f.name) for f in fields(value)}
+    return str(value)
+
+
+def _payload_size(result: Any) -> int:
+    """Bytes of the result as JSON, standing in for the response body"""
+    try:
+        return len(json.dumps(result, default=_encode, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _traced_iterator(iterator: Iterator, call: CallRecord) -> Iterator:
+    """Charge the pages an iter_* method fetches to its call as they are consumed"""
+    while True:
+        _local.call = call
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            call.ms += (time.perf_counter() - start) * 1000
+            _local.call = None
+        call.rows += 1
+        yield item
+
+
+def _trace_method(func):
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        trace = current_trace()
+        if trace is None or getattr(_local, "call", None) is not None:
+            # Not tracing, or called by another traced method that owns the call
+            return func(self, *args, **kwargs)
+        call = CallRecord(method=func.__name__, caller=_caller())
+        trace.calls.append(call)
+        _local.call = call
+        start = time.perf_counter()
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception:
+            call.error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.call = None
+            call.ms += elapsed * 1000
+        if isinstance(result, GeneratorType):
+            return _traced_iterator(result, call)
+        call.rows += _row_count(result)
+        if call.round_trips:
+            call.payload_bytes += _payload_size(result)
+        return result
+    return wrapper
+
+
+def traced(cls):
+    """Class decorator: trace every public method of a backend, including inherited ones"""
+    for name in dir(cls):
+        if name.startswith("_") or name == "request_scope":
+            continue
+        attribute = getattr(cls, name)
+        if callable(attribute) and not isinstance(attribute, type):
+            setattr(cls, name, _trace_method(attribute))
+    return cls
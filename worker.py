@@ -0,0 +1,126 @@
+"""
+Background bet resolution, off the Streamlit script thread
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+from models import PublicUser
+from scoring import ScoringManager
+from tracing import log, trace_run
+
+# Resolutions that may run at once; more are queued
+MAX_RESOLVE_WORKERS = int(os.getenv("REEDZ_RESOLVE_WORKERS", "2"))
+
+# Finished tasks kept around for progress polling
+MAX_FINISHED_TASKS = 100
+
+
+@dataclass
+class ResolutionTask:
+    """Progress of one queued resolve request, as shown in the Resolve Bet tab"""
+    id: str
+    label: str
+    status: str = "queued"  # queued, running, done or failed
+    message: str = ""
+    predictions_scored: int = 0
+    predictions_total: int = 0
+    credits_applied: int = 0
+    credits_total: int = 0
+    submitted_at: float = 0.0
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+class ResolutionWorker:
+    """Run resolve_bet / resolve_week on a bounded thread pool and track their progress"""
+
+    def __init__(self, scoring: ScoringManager, max_workers: int = MAX_RESOLVE_WORKERS):
+        self.scoring = scoring
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reedz-resolve")
+        self._tasks: Dict[str, ResolutionTask] = {}
+        self._lock = threading.Lock()
+
+    def submit_bet(self, user: PublicUser, bet_id: int, correct_answer: str) -> Tuple[bool, str, Optional[str]]:
+        """Queue a bet resolution. Returns: (success, message, task_id)"""
+        if not user.is_admin():
+            return False, "Only commissioners can resolve bets", None
+        return self._submit(f"bet:{bet_id}", f"Bet {bet_id}",
+                            lambda report: self.scoring.resolve_bet(user, bet_id, correct_answer, on_progress=report))
+
+    def submit_week(self, user: PublicUser, week: int, answers: Dict[int, str]) -> Tuple[bool, str, Optional[str]]:
+        """Queue a whole-week resolution. Returns: (success, message, task_id)"""
+        if not user.is_admin():
+            return False, "Only commissioners can resolve bets", None
+        answers = dict(answers)
+        return self._submit(f"week:{week}", f"Week {week}",
+                            lambda report: self.scoring.resolve_week(user, week, answers, on_progress=report))
+
+    def get_task(self, task_id: str) -> Optional[ResolutionTask]:
+        """A snapshot of a task's progress, safe to read while it runs"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return replace(task) if task else None
+
+    def get_tasks(self, task_ids: List[str]) -> List[ResolutionTask]:
+        with self._lock:
+            return [replace(self._tasks[task_id]) for task_id in task_ids if task_id in self._tasks]
+
+    def _submit(self, task_id: str, label: str, run: Callable) -> Tuple[bool, str, Optional[str]]:
+        with self._lock:
+            existing = self._tasks.get(task_id)
+            if existing and not existing.finished:
+                return True, f"{label} is already being resolved", task_id
+            self._prune()
+            self._tasks[task_id] = ResolutionTask(id=task_id, label=label, submitted_at=time.time())
+        self._pool.submit(self._run, task_id, run)
+        return True, f"{label} queued for resolution", task_id
+
+    def _run(self, task_id: str, run: Callable):
+        self._update(task_id, status="running")
+
+        def report(stage: str, done: int, total: int):
+            if stage == "scoring":
+                self._update(task_id, predictions_scored=done, predictions_total=total)
+            else:
+                self._update(task_id, credits_applied=done, credits_total=total)
+
+        try:
+            with trace_run(f"worker {task_id}"):
+                success, message, _ = run(report)
+        except Exception as e:
+            log(logging.ERROR, "resolution_failed", task_id=task_id, error=str(e))
+            success, message = False, f"Error: {str(e)}"
+        self._update(task_id, status="done" if success else "failed", message=message, finished_at=time.time())
+
+    def _update(self, task_id: str, **fields):
+        with self._lock:
+            task = self._tasks[task_id]
+            for name, value in fields.items():
+                setattr(task, name, value)
+
+    def _prune(self):
+        """Forget the oldest finished tasks beyond MAX_FINISHED_TASKS (caller holds the lock)"""
+        finished = sorted((t for t in self._tasks.values() if t.finished), key=lambda t: t.finished_at)
+        for task in finished[:max(0, len(finished) - MAX_FINISHED_TASKS)]:
+            del self._tasks[task.id]
+
+
+_worker: Optional[ResolutionWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_worker(scoring: ScoringManager) -> ResolutionWorker:
+    """The process-wide worker, shared by every Streamlit session"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = ResolutionWorker(scoring)
+    return _worker